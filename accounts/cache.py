@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.contrib import auth
+from django.core.exceptions import ObjectDoesNotExist
+from home_budget.cache import get_shared_cache
+from home_budget.sharding import get_current_shard
+
+
+def make_user_cache_key(user_id):
+    return f"accounts:user:{user_id}"
+
+
+def get_cached_user(request):
+    """User of a request with its profile loaded, cached between requests
+
+    The entry is only used while the session auth hash and the shard of the
+    user match, so a password change, a logout or a move stops using it;
+    saving the user or the profile deletes it. Only a shared cache is used,
+    with a per-process one the other workers would miss the deletion and
+    keep the sessions of a deactivated user or an old password logged in.
+    """
+    user_cache = get_shared_cache()
+    user_id = request.session.get(auth.SESSION_KEY)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if user_cache is None or user_id is None or session_hash is None:
+        return auth.get_user(request)
+
+    key = make_user_cache_key(user_id)
+    # The profile is kept with the shard it was read from, after a move of
+    # the user it is loaded again
+    shard = get_current_shard()
+    cached = user_cache.get(key)
+    if cached is not None and cached[:2] == (session_hash, shard):
+        return cached[2]
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        # Loaded apart from the user, with sharding it lives on another database
+        try:
+            user.userprofile
+        except ObjectDoesNotExist:
+            pass
+        user_cache.set(key, (session_hash, shard, user), settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    user_cache = get_shared_cache()
+    if user_cache:
+        user_cache.delete(make_user_cache_key(user_id))
@@ -0,0 +1,79 @@
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.cache import invalidate_cached_user
+from home_budget.sharding import (
+    copy_user_rows,
+    delete_user_rows,
+    get_user_shard,
+    set_user_shard,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the rows of a user to another database shard. Writes of the user "
+        "are refused with a 503 until the move finishes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="User whose rows are moved")
+        parser.add_argument("shard", help="Database alias of the target shard")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows copied per INSERT",
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=5,
+            help="Seconds given to the writes in progress before copying",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        target = options["shard"]
+        if target not in settings.DATABASE_SHARDS:
+            raise CommandError(
+                f"'{target}' is not a shard, choose from "
+                f"{', '.join(settings.DATABASE_SHARDS)}"
+            )
+        source = get_user_shard(user.pk)
+        if source == target:
+            raise CommandError(f"User '{user.username}' is already on '{target}'")
+
+        # Block the writes of the user and let the running ones finish, the
+        # rows copied below are then the last ones written on the source
+        set_user_shard(user.pk, source, moving=True)
+        time.sleep(options["wait"])
+
+        # Copy first and only then switch the lookup, an interrupted move
+        # leaves the user on the source and can be run again
+        try:
+            with transaction.atomic(using=target):
+                delete_user_rows(user.pk, target)
+                copied = copy_user_rows(
+                    user.pk, source, target, batch_size=options["batch_size"]
+                )
+        except BaseException:
+            set_user_shard(user.pk, source)
+            raise
+        set_user_shard(user.pk, target)
+        # The cached profile still points to the source shard
+        invalidate_cached_user(user.pk)
+        with transaction.atomic(using=source):
+            delete_user_rows(user.pk, source)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Moved {copied} rows of '{user.username}' from {source} to {target}"
+            )
+        )
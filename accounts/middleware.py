@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+from .cache import get_cached_user
+
+
+class CachedUserMiddleware:
+    """Load the user and profile of a request from the cache when unchanged"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        return self.get_response(request)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+import home_budget.fields
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+from django.db.models.functions import Cast, Round
+
+
+def amount_to_cents(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.update(
+        monthly_budget_cents=Cast(Round(F('monthly_budget') * 100), models.BigIntegerField())
+    )
+
+
+def cents_to_amount(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.update(
+        monthly_budget=ExpressionWrapper(
+            F('monthly_budget_cents') / 100.0,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_userprofile_currency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='monthly_budget_cents',
+            field=home_budget.fields.MoneyField(max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='monthly_budget',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(amount_to_cents, cents_to_amount),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='monthly_budget',
+        ),
+        migrations.RenameField(
+            model_name='userprofile',
+            old_name='monthly_budget_cents',
+            new_name='monthly_budget',
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='monthly_budget',
+            field=home_budget.fields.MoneyField(blank=True, max_digits=10, null=True),
+        ),
+    ]
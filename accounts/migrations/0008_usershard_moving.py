@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_usershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usershard',
+            name='moving',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,21 +1,31 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 import pytz
+from home_budget.fields import MoneyField
+from home_budget.sharding import (
+    ShardedQuerySet,
+    delete_user_rows,
+    get_user_shard,
+    pick_shard,
+    set_user_shard,
+    sharding_enabled,
+    use_shard,
+)
+from .cache import invalidate_cached_user
 
 
 class UserProfile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # Sin restricción en la base de datos, el usuario puede estar en otro shard
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False)
     timezone = models.CharField(
         max_length=50, default="UTC", choices=[(tz, tz) for tz in pytz.common_timezones]
     )
     profile_picture = models.ImageField(
         upload_to="profile_pics", blank=True
     )
-    monthly_budget = models.DecimalField(
-        max_digits=10, decimal_places=2, null=True, blank=True
-    )
+    monthly_budget = MoneyField(max_digits=10, null=True, blank=True)
     currency = models.CharField(
         max_length=3,
         default="BRL",
@@ -29,16 +39,49 @@ class UserProfile(models.Model):
         ],
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     def __str__(self):
         return f"Perfil de {self.user.username}"
 
 
+class UserShard(models.Model):
+    """Shard that holds the rows of a user"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    shard = models.CharField(max_length=50)
+    # Mientras se mueven sus filas a otro shard se rechazan sus escrituras
+    moving = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.shard}"
+
+
+@receiver(post_save, sender=User)
+def assign_user_shard(sender, instance, created, **kwargs):
+    # Antes de crear el perfil, que ya se guarda en el shard del usuario
+    if created and sharding_enabled():
+        set_user_shard(instance.pk, pick_shard(instance.pk))
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_shard_rows(sender, instance, **kwargs):
+    # El borrado en cascada solo alcanza a la base de datos por defecto
+    shard = get_user_shard(instance.pk)
+    if shard != "default":
+        delete_user_rows(instance.pk, shard)
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
+        with use_shard(get_user_shard(instance.pk)):
+            UserProfile.objects.create(user=instance)
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk if sender is User else instance.user_id)
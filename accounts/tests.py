@@ -1,3 +1,175 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from categories.models import Category
+from home_budget.routers import ShardRouter
+from home_budget.sharding import (
+    get_user_shard,
+    set_user_shard,
+    sharding_enabled,
+    use_shard,
+)
+from operations.models import Operation
+from reports.models import DailyRollup, UserDataVersion
+from .cache import get_cached_user, make_user_cache_key
+from .models import UserProfile
 
-# Create your tests here.
+
+@override_settings(DATABASE_SHARDS=["default", "shard1"])
+@mock.patch("home_budget.routers.get_user_shard", return_value="shard1")
+class ShardRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ShardRouter()
+
+    def test_user_hint_picks_the_shard_outside_of_requests(self, get_user_shard):
+        self.assertEqual(self.router.db_for_write(Operation, user_id=1), "shard1")
+        get_user_shard.assert_called_once_with(1)
+
+    def test_current_shard_comes_first(self, get_user_shard):
+        with use_shard("default"):
+            self.assertEqual(self.router.db_for_read(Operation, user_id=1), "default")
+        get_user_shard.assert_not_called()
+
+    def test_user_instance_hint(self, get_user_shard):
+        user = User(pk=1)
+        self.assertEqual(self.router.db_for_write(Category, instance=user), "shard1")
+
+    def test_saved_instances_stay_on_their_database(self, get_user_shard):
+        operation = Operation(user_id=1)
+        operation._state.db = "default"
+        self.assertEqual(
+            self.router.db_for_write(Operation, instance=operation), "default"
+        )
+
+    def test_unsharded_models_use_the_default_database(self, get_user_shard):
+        self.assertIsNone(self.router.db_for_read(User, user_id=1))
+
+    def test_migrations(self, get_user_shard):
+        self.assertTrue(self.router.allow_migrate("shard1", "operations", "operation"))
+        self.assertTrue(self.router.allow_migrate("shard1", "auth", "user"))
+        self.assertTrue(self.router.allow_migrate("default", "auth", "user"))
+        self.assertFalse(self.router.allow_migrate("shard1", "sessions", "session"))
+        self.assertFalse(self.router.allow_migrate("shard1", "reports", "exportjob"))
+
+
+class ShardedQuerySetTests(SimpleTestCase):
+    def test_filter_and_create_hint_their_user(self):
+        user = User(pk=3)
+        self.assertEqual(Operation.objects.filter(user=user)._hints, {"user_id": 3})
+        self.assertEqual(Operation.objects.filter(user_id=4)._hints, {"user_id": 4})
+
+    def test_hints_are_not_shared_between_clones(self):
+        queryset = Category.objects.all()
+        queryset.filter(user_id=3)
+        self.assertEqual(queryset._hints, {})
+
+
+class CachedUserTests(TestCase):
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("cached", password="pw")
+        self.client.force_login(self.user)
+        self.request = RequestFactory().get("/")
+        self.request.session = self.client.session
+
+    def test_a_per_process_cache_is_not_used(self):
+        self.assertEqual(get_cached_user(self.request), self.user)
+        self.assertIsNone(cache.get(make_user_cache_key(self.user.pk)))
+
+    def test_a_shared_cache_keeps_the_user_until_it_changes(self):
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": cache_dir,
+                }
+            }
+        ):
+            self.assertEqual(get_cached_user(self.request), self.user)
+            with self.assertNumQueries(0):
+                self.assertEqual(get_cached_user(self.request), self.user)
+
+            self.user.set_password("new")
+            self.user.save()
+
+            key = make_user_cache_key(self.user.pk)
+            self.assertIsNone(caches["default"].get(key))
+            self.assertFalse(get_cached_user(self.request).is_authenticated)
+
+
+@skipUnless(sharding_enabled(), "Set DB_SHARDS to test against shard databases")
+class ShardingTests(TestCase):
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        # Shard lookups are cached by user id, which the rollbacks reuse
+        cache.clear()
+        self.shard = settings.DATABASE_SHARDS[-1]
+        self.user = User.objects.create_user("sharded", password="pw")
+        set_user_shard(self.user.pk, self.shard)
+
+    def test_rows_created_outside_of_requests_go_to_the_user_shard(self):
+        category = Category.objects.create(user=self.user, name="Food", type="gasto")
+        operation = Operation.objects.create(
+            user=self.user, category=category, amount=10, date=date.today()
+        )
+
+        self.assertEqual(category._state.db, self.shard)
+        self.assertEqual(operation._state.db, self.shard)
+        self.assertEqual(Operation.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            DailyRollup.objects.using(self.shard).filter(user=self.user).count(), 1
+        )
+        self.assertFalse(Operation.objects.using("default").exists())
+
+    def test_new_users_get_their_profile_on_their_shard(self):
+        user = User.objects.create_user("new", password="pw")
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual(profile._state.db, get_user_shard(user.pk))
+
+    def test_deleting_a_user_deletes_their_shard_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(
+                user=self.user, name="Food", type="gasto"
+            )
+            Operation.objects.create(
+                user=self.user, category=category, amount=10, date=date.today()
+            )
+        self.assertTrue(UserDataVersion.objects.using(self.shard).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertFalse(Operation.objects.using(self.shard).exists())
+        self.assertFalse(UserDataVersion.objects.using(self.shard).exists())
+
+    def test_moving_a_user_copies_their_rows_and_switches_the_lookup(self):
+        category = Category.objects.create(user=self.user, name="Food", type="gasto")
+        Operation.objects.create(
+            user=self.user, category=category, amount=10, date=date.today()
+        )
+
+        call_command("move_user_shard", "sharded", "default", wait=0, stdout=StringIO())
+
+        self.assertEqual(get_user_shard(self.user.pk), "default")
+        operation = Operation.objects.using("default").get(user=self.user)
+        self.assertEqual(operation.category.name, "Food")
+        self.assertFalse(Operation.objects.using(self.shard).exists())
+
+    def test_writes_are_refused_while_the_user_moves(self):
+        set_user_shard(self.user.pk, self.shard, moving=True)
+        self.client.force_login(self.user)
+
+        response = self.client.post(reverse("operation-export"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "10")
+        self.assertEqual(self.client.get(reverse("operation-export")).status_code, 200)
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from home_budget.sharding import ShardedQuerySet
 
 
 class Category(models.Model):
@@ -8,7 +9,9 @@ class Category(models.Model):
         ("ingreso", "Ingreso"),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="categories", db_constraint=False
+    )
     name = models.CharField(max_length=100, verbose_name="Nombre")
     description = models.TextField(blank=True, null=True, verbose_name="Descripción")
     type = models.CharField(
@@ -22,12 +25,17 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creado el")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Actualizado el")
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ["name"]
         # Asegurar que cada usuario tenga nombres de categoría únicos
         unique_together = ["user", "name"]
+        indexes = [
+            models.Index(fields=["user", "type"], name="category_user_type_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
@@ -0,0 +1 @@
+from . import db, sharding  # noqa: F401
@@ -0,0 +1,13 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def get_shared_cache():
+    """Default cache when every process sees it, None for a locmem cache
+
+    Entries whose deletion has to reach every worker at once, like the shard
+    of a user being moved or the user of a session after a password change,
+    are only cached in a shared backend.
+    """
+    backend = caches["default"]
+    return None if isinstance(backend, LocMemCache) else backend
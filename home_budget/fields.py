@@ -0,0 +1,75 @@
+from decimal import Decimal, InvalidOperation
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+DECIMAL_PLACES = 2
+CENT = Decimal(1).scaleb(-DECIMAL_PLACES)
+
+
+def to_cents(value):
+    """Convert an amount of money to integer minor units"""
+    return int(Decimal(value).quantize(CENT).scaleb(DECIMAL_PLACES))
+
+
+def from_cents(cents):
+    """Convert integer minor units to an amount of money"""
+    return Decimal(int(cents)).scaleb(-DECIMAL_PLACES)
+
+
+class MoneyField(models.BigIntegerField):
+    """Amount of money stored as integer cents and exposed as a Decimal
+
+    Sums and comparisons run on integers in the database, while Python code,
+    forms and templates keep working with Decimal values with two decimals.
+    """
+
+    description = _("Amount of money stored in minor units")
+    default_error_messages = {
+        "invalid": _("“%(value)s” value must be a decimal number."),
+    }
+
+    def __init__(self, *args, max_digits=None, **kwargs):
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_digits is not None:
+            kwargs["max_digits"] = self.max_digits
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return from_cents(value)
+
+    def to_python(self, value):
+        if value is None:
+            return value
+        try:
+            return Decimal(str(value)).quantize(CENT)
+        except (InvalidOperation, ValueError):
+            raise exceptions.ValidationError(
+                self.error_messages["invalid"],
+                code="invalid",
+                params={"value": value},
+            )
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        return to_cents(self.to_python(value))
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(
+            self,
+            **{
+                "form_class": forms.DecimalField,
+                "max_digits": self.max_digits,
+                "decimal_places": DECIMAL_PLACES,
+                **kwargs,
+            },
+        )
@@ -0,0 +1,228 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from .sharding import (
+    SHARDED_MODELS,
+    get_current_shard,
+    get_user_shard,
+    get_user_shard_state,
+    is_sharded_model,
+    sharding_enabled,
+    use_shard,
+)
+
+CACHE_DATABASE = "cache"
+REPLICA_DATABASE = "replica"
+REPLICA_APPS = {"reports"}
+# Bookkeeping read right after it is written, replication lag would serve
+# stale versions or miss a just created job
+PRIMARY_MODELS = {
+    "reports.userdataversion",
+    "reports.periodsnapshot",
+    "reports.exportjob",
+}
+SESSION_KEY = "_db_primary_until"
+
+# Routing state of the current request, None outside of requests so worker
+# threads and commands always read from the primary
+_request_routing = ContextVar("request_routing", default=None)
+
+
+class RequestRouting:
+    """Whether the current request may read from the replica and if it wrote"""
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary within the block, even in replica requests
+
+    For results cached or frozen under the data version, which is read from
+    the primary: built from a lagging replica they would keep stale figures
+    under the new version.
+    """
+    routing = _request_routing.get()
+    if routing is None or not routing.use_replica:
+        yield
+        return
+
+    routing.use_replica = False
+    try:
+        yield
+    finally:
+        routing.use_replica = not routing.wrote
+
+
+class CacheRouter:
+    """Keep the table of the database cache in its own database"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label == "django_cache"
+            and CACHE_DATABASE in settings.DATABASES
+        ):
+            return CACHE_DATABASE
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == CACHE_DATABASE:
+            return app_label == "django_cache"
+        return None
+
+
+class ReplicaRouter:
+    """Send reads of the report models to the replica database
+
+    Requests that write, and the ones that follow them within
+    DB_REPLICA_STICKY_SECONDS, read from the primary to see their own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _request_routing.get()
+        if (
+            routing
+            and routing.use_replica
+            and model._meta.app_label in REPLICA_APPS
+            and model._meta.label_lower not in PRIMARY_MODELS
+            # The replica only mirrors the default database
+            and not is_sharded_model(model)
+        ):
+            return REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = _request_routing.get()
+        if routing:
+            routing.use_replica = False
+            routing.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        if {obj1._state.db, obj2._state.db} <= {"default", REPLICA_DATABASE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica gets its schema and data from the primary
+        if db == REPLICA_DATABASE:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Allow replica reads per request and keep writers on the primary"""
+
+    def __init__(self, get_response):
+        if REPLICA_DATABASE not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = RequestRouting(
+            use_replica=request.method in ("GET", "HEAD")
+            and request.session.get(SESSION_KEY, 0) < time.time()
+        )
+        token = _request_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_routing.reset(token)
+
+        if routing.wrote:
+            request.session[SESSION_KEY] = time.time() + settings.REPLICA_STICKY_SECONDS
+        return response
+
+
+class ShardRouter:
+    """Send the per-user models to the shard of their user
+
+    The shard comes from the instance in the hints, from the user of the
+    current request or use_shard(), or else from the user_id hint of a
+    ShardedQuerySet. Everything else, auth and sessions included, stays on
+    the default database.
+    """
+
+    def _db_for_model(self, model, **hints):
+        if not is_sharded_model(model):
+            return None
+
+        instance = hints.get("instance")
+        if instance is not None:
+            if instance._meta.label_lower in SHARDED_MODELS:
+                if instance._state.db:
+                    return instance._state.db
+                return get_user_shard(instance.user_id)
+            if isinstance(instance, get_user_model()):
+                return get_user_shard(instance.pk)
+
+        shard = get_current_shard()
+        if shard is None and hints.get("user_id") is not None:
+            shard = get_user_shard(hints["user_id"])
+        return shard
+
+    db_for_read = _db_for_model
+    db_for_write = _db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Per-user rows point to their user on the default database
+        user_model = get_user_model()
+        if sharding_enabled() and (
+            isinstance(obj1, user_model) or isinstance(obj2, user_model)
+        ):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not sharding_enabled() or model_name is None:
+            return None
+        if f"{app_label}.{model_name}" in SHARDED_MODELS:
+            return db in settings.DATABASE_SHARDS
+        # The initial migrations of the per-user models reference auth_user,
+        # every shard gets the (unused) auth tables until the constraints go
+        if app_label in ("auth", "contenttypes"):
+            return True
+        return db == "default"
+
+
+class ShardMiddleware:
+    """Route the per-user queries of a request to the shard of its user
+
+    The user comes from the session, so request.user and its profile are
+    loaded from the shard. Writes are refused while the user is being moved.
+    """
+
+    def __init__(self, get_response):
+        if not sharding_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = request.session.get(auth.SESSION_KEY)
+        if user_id is None:
+            return self.get_response(request)
+
+        shard, moving = get_user_shard_state(
+            get_user_model()._meta.pk.to_python(user_id)
+        )
+        if moving and request.method not in ("GET", "HEAD", "OPTIONS"):
+            response = HttpResponse(
+                _("Tus datos se están moviendo, inténtalo de nuevo en unos segundos"),
+                status=503,
+            )
+            response["Retry-After"] = 10
+            return response
+
+        with use_shard(shard):
+            return self.get_response(request)
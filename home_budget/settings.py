@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -51,6 +52,9 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "accounts.middleware.CachedUserMiddleware",
+    "home_budget.routers.ShardMiddleware",
+    "home_budget.routers.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -81,12 +85,93 @@ WSGI_APPLICATION = "home_budget.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Opt-in production tuning of SQLite, see SQLITE_PRAGMAS below
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "False").lower() == "true"
+
+# PostgreSQL when DB_NAME is set, SQLite otherwise
+if os.getenv("DB_NAME"):
+    # psycopg 3 connection pool; pooled connections go back to the pool at the
+    # end of every request, so persistent connections only apply without it
+    DB_POOL = os.getenv("DB_POOL", "False").lower() == "true"
+
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME"),
+            "USER": os.getenv("DB_USER", ""),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": (
+                {
+                    "pool": {
+                        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+                        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                        "timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+                    }
+                }
+                if DB_POOL
+                else {}
+            ),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            # Take the write lock when the transaction starts, so concurrent
+            # writers wait on busy_timeout instead of failing as locked
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"} if SQLITE_TUNING else {},
+        }
+    }
+
+# Extra databases holding the per-user rows (home_budget/sharding.py); they
+# share the primary settings apart from the database name
+DATABASE_SHARDS = ["default"]
+for index, name in enumerate(filter(None, os.getenv("DB_SHARDS", "").split(","))):
+    DATABASES[f"shard{index + 1}"] = {**DATABASES["default"], "NAME": name.strip()}
+    DATABASE_SHARDS.append(f"shard{index + 1}")
+
+# Seconds the shard of a user stays cached
+SHARD_LOOKUP_TIMEOUT = int(os.getenv("SHARD_LOOKUP_TIMEOUT", 300))
+
+# Optional read replica for the reports app (home_budget/routers.py); it
+# shares the primary settings apart from the host or SQLite file
+if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.getenv("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "HOST": os.getenv("DB_REPLICA_HOST", DATABASES["default"].get("HOST", "")),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = [
+    "home_budget.routers.CacheRouter",
+    "home_budget.routers.ReplicaRouter",
+    "home_budget.routers.ShardRouter",
+]
+
+# Seconds a user keeps reading from the primary after a write
+REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
+# PRAGMAs applied to every SQLite connection when tuned (home_budget/db.py).
+# WAL lets reads go on while another worker writes
+SQLITE_PRAGMAS = (
+    {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 128 * 1024 * 1024)),
+        # Negative sizes are in KiB
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),
+        "temp_store": "MEMORY",
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
     }
-}
+    if SQLITE_TUNING
+    else {}
+)
 
 
 # Password validation
@@ -142,3 +227,88 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 
 CSRF_TRUSTED_ORIGINS = os.getenv("CSRF_TRUSTED_ORIGINS").split(",")
+
+
+# Cache shared by the workers. CACHE_URL selects Redis or Memcached, otherwise
+# CACHE_BACKEND picks a per-process locmem cache, a file cache or a table in
+# its own SQLite file for single host deployments (run createcachetable
+# --database cache once)
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem").lower()
+
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("memcached://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": CACHE_URL.removeprefix("memcached://"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv(
+                "CACHE_DIR", os.path.join(tempfile.gettempdir(), "home_budget_cache")
+            ),
+        }
+    }
+elif CACHE_BACKEND == "sqlite":
+    DATABASES["cache"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.getenv("CACHE_SQLITE_PATH", BASE_DIR / "cache.sqlite3"),
+    }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+CACHES["default"]["KEY_PREFIX"] = "home_budget"
+CACHES["default"]["TIMEOUT"] = int(os.getenv("CACHE_TIMEOUT", 300))
+
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Seconds the user and profile of a session stay cached, only in a shared cache
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 300))
+
+
+# Seconds a computed report context stays cached; writes invalidate it earlier
+REPORT_CACHE_TIMEOUT = int(os.getenv("REPORT_CACHE_TIMEOUT", 60 * 60))
+
+
+# Threads of the in-process worker that renders background exports
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+
+# Seconds a job may run before its worker is taken as stopped and the job is
+# queued again, and seconds finished jobs and their files are kept
+EXPORT_JOB_TIMEOUT = int(os.getenv("EXPORT_JOB_TIMEOUT", 30 * 60))
+EXPORT_JOB_RETENTION = int(os.getenv("EXPORT_JOB_RETENTION", 7 * 24 * 60 * 60))
+
+# Private directory of the background export files, outside MEDIA_ROOT so
+# they are only sent by the download view to their owner
+EXPORT_JOB_DIR = os.getenv(
+    "EXPORT_JOB_DIR", os.path.join(BASE_DIR, "private", "exports")
+)
+
+
+# Disk cache of rendered exports, evicted by least recent use past its size
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "home_budget_exports")
+)
+EXPORT_CACHE_MAX_SIZE = int(os.getenv("EXPORT_CACHE_MAX_SIZE", 200 * 1024 * 1024))
@@ -0,0 +1,200 @@
+import contextlib
+from contextvars import ContextVar
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_migrate, pre_migrate
+from django.dispatch import receiver
+from .cache import get_shared_cache
+
+# Models whose rows belong to a single user, in the order they are copied
+SHARDED_MODELS = [
+    "accounts.userprofile",
+    "categories.category",
+    "operations.operation",
+    "reports.savedreport",
+    "reports.dailyrollup",
+    "reports.userdataversion",
+    "reports.periodsnapshot",
+]
+
+# Shard of the user being served, set per request or by use_shard()
+_current_shard = ContextVar("current_shard", default=None)
+
+
+def sharding_enabled():
+    return settings.DATABASE_SHARDS != ["default"]
+
+
+def is_sharded_model(model):
+    return sharding_enabled() and model._meta.label_lower in SHARDED_MODELS
+
+
+def get_current_shard():
+    return _current_shard.get()
+
+
+@contextlib.contextmanager
+def use_shard(alias):
+    """Route the per-user queries of the block to a shard"""
+    token = _current_shard.set(alias)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+@receiver(pre_migrate)
+def route_data_migrations(sender, using, **kwargs):
+    """Run the per-user queries of data migrations on the database migrated"""
+    if sharding_enabled():
+        _current_shard.set(using)
+
+
+@receiver(post_migrate)
+def reset_data_migration_routing(sender, **kwargs):
+    _current_shard.set(None)
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet of per-user rows that passes their user to the router
+
+    Outside of requests there is no current shard, the user given to
+    filter() or create() picks it instead.
+    """
+
+    def filter(self, *args, **kwargs):
+        return super().filter(*args, **kwargs)._hint_user(kwargs)
+
+    def create(self, **kwargs):
+        return super(ShardedQuerySet, self._hint_user(kwargs)).create(**kwargs)
+
+    def _hint_user(self, kwargs):
+        user = kwargs.get("user", kwargs.get("user_id"))
+        if user is None or "user_id" in self._hints:
+            return self
+        clone = self._chain()
+        # The hints are shared between clones, never change them in place
+        clone._hints = {**self._hints, "user_id": getattr(user, "pk", user)}
+        return clone
+
+
+def _make_shard_cache_key(user_id):
+    return f"user_shard:{user_id}"
+
+
+def get_user_shard_state(user_id):
+    """Shard holding the rows of a user and whether they are being moved"""
+    if not sharding_enabled():
+        return "default", False
+
+    lookup_cache = get_shared_cache()
+    cache_key = _make_shard_cache_key(user_id)
+    state = lookup_cache.get(cache_key) if lookup_cache else None
+    if state is None:
+        UserShard = apps.get_model("accounts", "UserShard")
+        state = (
+            UserShard.objects.filter(user_id=user_id)
+            .values_list("shard", "moving")
+            .first()
+            # Users created before sharding keep their rows on the default database
+            or ("default", False)
+        )
+        if lookup_cache:
+            lookup_cache.set(cache_key, state, settings.SHARD_LOOKUP_TIMEOUT)
+    return tuple(state)
+
+
+def get_user_shard(user_id):
+    """Database alias holding the rows of a user"""
+    return get_user_shard_state(user_id)[0]
+
+
+def set_user_shard(user_id, shard, moving=False):
+    """Point the lookup of a user to a shard, moving blocks their writes"""
+    UserShard = apps.get_model("accounts", "UserShard")
+    UserShard.objects.update_or_create(
+        user_id=user_id, defaults={"shard": shard, "moving": moving}
+    )
+    lookup_cache = get_shared_cache()
+    if lookup_cache:
+        lookup_cache.set(
+            _make_shard_cache_key(user_id),
+            (shard, moving),
+            settings.SHARD_LOOKUP_TIMEOUT,
+        )
+
+
+def pick_shard(user_id):
+    """Shard of a new user, spread by user id"""
+    return settings.DATABASE_SHARDS[user_id % len(settings.DATABASE_SHARDS)]
+
+
+def copy_user_rows(user_id, source, target, batch_size=1000):
+    """Copy the rows of a user between shards in batches
+
+    Rows get new primary keys on the target, foreign keys between the copied
+    models are remapped to them. Returns the number of copied rows.
+    """
+    models = [apps.get_model(label) for label in SHARDED_MODELS]
+    referenced = {
+        field.related_model._meta.label_lower
+        for model in models
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model._meta.label_lower in SHARDED_MODELS
+    }
+    id_maps = {}
+    copied = 0
+
+    for model in models:
+        label = model._meta.label_lower
+        remapped_fields = [
+            (field.attname, id_maps[field.related_model._meta.label_lower])
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model._meta.label_lower in id_maps
+        ]
+        if label in referenced:
+            id_maps[label] = {}
+
+        rows = (
+            model._base_manager.using(source)
+            .filter(user_id=user_id)
+            .order_by("pk")
+            .iterator(chunk_size=batch_size)
+        )
+        batch, old_ids = [], []
+        for row in rows:
+            old_ids.append(row.pk)
+            row.pk = None
+            for attname, id_map in remapped_fields:
+                value = getattr(row, attname)
+                if value is not None:
+                    setattr(row, attname, id_map[value])
+            batch.append(row)
+
+            if len(batch) >= batch_size:
+                copied += _create_batch(
+                    model, target, batch, old_ids, id_maps.get(label)
+                )
+                batch, old_ids = [], []
+        if batch:
+            copied += _create_batch(model, target, batch, old_ids, id_maps.get(label))
+
+    return copied
+
+
+def _create_batch(model, target, batch, old_ids, id_map):
+    created = model._base_manager.using(target).bulk_create(batch)
+    if id_map is not None:
+        id_map.update(zip(old_ids, (row.pk for row in created)))
+    return len(created)
+
+
+def delete_user_rows(user_id, using):
+    """Delete the rows of a user from a shard, returns the number of rows"""
+    deleted = 0
+    for label in reversed(SHARDED_MODELS):
+        rows = apps.get_model(label)._base_manager.using(using).filter(user_id=user_id)
+        # Skips the signals, they would update the rollups being removed
+        deleted += rows._raw_delete(using)
+    return deleted
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 19:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("categories", "0002_indexes"),
+        ("operations", "0002_operation_delete_expense"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="operation",
+            index=models.Index(fields=["user", "date"], name="operation_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="operation",
+            index=models.Index(
+                fields=["user", "category", "date"], name="operation_user_cat_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="operation",
+            index=models.Index(
+                fields=["user", "-date", "-created_at"],
+                name="operation_user_recent_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_operation_type(apps, schema_editor):
+    Operation = apps.get_model('operations', 'Operation')
+    for type in ('gasto', 'ingreso'):
+        Operation.objects.filter(category__type=type).update(type=type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_indexes'),
+        ('operations', '0003_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operation',
+            name='type',
+            field=models.CharField(choices=[('gasto', 'Gasto'), ('ingreso', 'Ingreso')], editable=False, max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['user', 'type', 'date', 'amount'], name='operation_user_type_date_idx'),
+        ),
+        migrations.RunPython(backfill_operation_type, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+import home_budget.fields
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+from django.db.models.functions import Cast, Round
+
+
+def amount_to_cents(apps, schema_editor):
+    Operation = apps.get_model('operations', 'Operation')
+    Operation.objects.update(
+        amount_cents=Cast(Round(F('amount') * 100), models.BigIntegerField())
+    )
+
+
+def cents_to_amount(apps, schema_editor):
+    Operation = apps.get_model('operations', 'Operation')
+    Operation.objects.update(
+        amount=ExpressionWrapper(
+            F('amount_cents') / 100.0,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0004_operation_type'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='operation',
+            name='operation_user_type_date_idx',
+        ),
+        migrations.AddField(
+            model_name='operation',
+            name='amount_cents',
+            field=home_budget.fields.MoneyField(max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(amount_to_cents, cents_to_amount),
+        migrations.RemoveField(
+            model_name='operation',
+            name='amount',
+        ),
+        migrations.RenameField(
+            model_name='operation',
+            old_name='amount_cents',
+            new_name='amount',
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='amount',
+            field=home_budget.fields.MoneyField(max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['user', 'type', 'date', 'amount'], name='operation_user_type_date_idx'),
+        ),
+    ]
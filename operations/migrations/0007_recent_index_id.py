@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_alter_category_user'),
+        ('operations', '0006_alter_operation_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='operation',
+            name='operation_user_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='operation_user_recent_idx'),
+        ),
+    ]
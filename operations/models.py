@@ -1,25 +1,70 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
 from categories.models import Category
 from django.urls import reverse
+from home_budget.fields import MoneyField
+from home_budget.sharding import ShardedQuerySet
 
 
 class Operation(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="operations")
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="operations", db_constraint=False
+    )
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, related_name="operations"
     )
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = MoneyField(max_digits=10)
+    # Copia del tipo de la categoría para filtrar sin JOIN
+    type = models.CharField(
+        max_length=10, choices=Category.TYPE_CHOICES, null=True, editable=False
+    )
     date = models.DateField()
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["user", "date"], name="operation_user_date_idx"),
+            models.Index(
+                fields=["user", "category", "date"], name="operation_user_cat_date_idx"
+            ),
+            models.Index(
+                fields=["user", "-date", "-created_at", "-id"],
+                name="operation_user_recent_idx",
+            ),
+            models.Index(
+                fields=["user", "type", "date", "amount"],
+                name="operation_user_type_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.category} - {self.amount} ({self.date})"
 
+    def save(self, *args, **kwargs):
+        self.type = self.category.type if self.category_id else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "category" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "type"}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse("operation-detail", kwargs={"pk": self.pk})
+
+
+@receiver(post_save, sender=Category)
+def sync_operation_type(sender, instance, created, **kwargs):
+    if not created:
+        instance.operations.exclude(type=instance.type).update(type=instance.type)
+
+
+@receiver(pre_delete, sender=Category)
+def clear_operation_type(sender, instance, **kwargs):
+    # Las operaciones quedan sin categoría, y por tanto sin tipo
+    instance.operations.update(type=None)
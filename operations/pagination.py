@@ -0,0 +1,121 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class KeysetPage:
+    """Page of a keyset paginator with the cursors of its neighbours"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Cursor pagination over a descending (date, created_at, id) ordering
+
+    Every page is fetched with a WHERE on the last row seen instead of an
+    OFFSET, and without counting the rows, so any page costs the same query.
+    """
+
+    fields = ("date", "created_at", "id")
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        """Page after or before the given cursor, or the first page"""
+        if before:
+            values = self.decode_cursor(before)
+            if values is not None:
+                return self._get_previous_page(values)
+        if after:
+            values = self.decode_cursor(after)
+            if values is not None:
+                return self._get_next_page(values, has_previous=True)
+        return self._get_next_page(None, has_previous=False)
+
+    def _get_next_page(self, values, has_previous):
+        queryset = self.queryset.order_by(*(f"-{field}" for field in self.fields))
+        if values is not None:
+            queryset = queryset.filter(self._filter(values, "lt"))
+        rows = list(queryset[: self.per_page + 1])
+
+        object_list = rows[: self.per_page]
+        return KeysetPage(
+            object_list,
+            next_cursor=(
+                self.encode_cursor(object_list[-1])
+                if len(rows) > self.per_page
+                else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(object_list[0])
+                if has_previous and object_list
+                else None
+            ),
+        )
+
+    def _get_previous_page(self, values):
+        queryset = self.queryset.order_by(*self.fields).filter(
+            self._filter(values, "gt")
+        )
+        rows = list(queryset[: self.per_page + 1])
+        if len(rows) <= self.per_page:
+            # Back at the beginning, show a full first page
+            return self._get_next_page(None, has_previous=False)
+
+        object_list = rows[: self.per_page][::-1]
+        return KeysetPage(
+            object_list,
+            next_cursor=self.encode_cursor(object_list[-1]),
+            previous_cursor=self.encode_cursor(object_list[0]),
+        )
+
+    def _filter(self, values, lookup):
+        """Rows past the cursor in the row value order of the fields"""
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            equal = {name: value for name, value in zip(self.fields[:i], values)}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+        # Bound the leading field on its own too, so the index range starts
+        # at the cursor instead of walking every earlier row of the user
+        return Q(**{f"{self.fields[0]}__{lookup}e": values[0]}) & condition
+
+    def encode_cursor(self, obj):
+        value = "|".join(
+            self.queryset.model._meta.get_field(field).value_to_string(obj)
+            for field in self.fields
+        )
+        return urlsafe_base64_encode(value.encode())
+
+    def decode_cursor(self, cursor):
+        """Field values of a cursor, or None if it is not valid"""
+        try:
+            values = force_str(urlsafe_base64_decode(cursor)).split("|")
+            if len(values) != len(self.fields):
+                return None
+            return [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (ValidationError, ValueError, UnicodeDecodeError):
+            return None
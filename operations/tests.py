@@ -1,3 +1,34 @@
+from datetime import date
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from categories.models import Category
+from home_budget.sharding import set_user_shard, sharding_enabled
+from .models import Operation
 
-# Create your tests here.
+
+@skipUnless(sharding_enabled(), "Set DB_SHARDS to test against shard databases")
+class ShardedOperationExportTests(TestCase):
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        # Shard lookups are cached by user id, which the rollbacks reuse
+        cache.clear()
+        self.user = User.objects.create_user("sharded", password="pw")
+        set_user_shard(self.user.pk, settings.DATABASE_SHARDS[-1])
+        category = Category.objects.create(user=self.user, name="Food", type="gasto")
+        for amount in (10, 20, 30):
+            Operation.objects.create(
+                user=self.user, category=category, amount=amount, date=date.today()
+            )
+        self.client.force_login(self.user)
+
+    def test_csv_rows_are_streamed_from_the_user_shard(self):
+        response = self.client.get(reverse("operation-export"))
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].endswith(",30.00"))
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path("", views.OperationListView.as_view(), name="operation-list"),
+    path("export/", views.OperationExportView.as_view(), name="operation-export"),
     path("create/", views.OperationCreateView.as_view(), name="operation-create"),
     path("<int:pk>/", views.OperationDetailView.as_view(), name="operation-detail"),
     path("<int:pk>/update/", views.OperationUpdateView.as_view(), name="operation-update"),
@@ -1,4 +1,7 @@
+import csv
+from django.http import StreamingHttpResponse
 from django.views.generic import (
+    View,
     ListView,
     DetailView,
     CreateView,
@@ -7,20 +10,20 @@ from django.views.generic import (
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
+from django.utils.functional import cached_property
 from categories.models import Category
+from reports.cache import UserFragmentCacheMixin
+from reports.models import DailyRollup
 from .models import Operation
 from .forms import OperationForm
+from .pagination import KeysetPaginator
 
 
-class OperationListView(LoginRequiredMixin, ListView):
-    model = Operation
-    paginate_by = 10
-    template_name = "operation_list.html"
-
-    def get_queryset(self):
-        queryset = Operation.objects.filter(user=self.request.user)
+class OperationFilterMixin:
+    """Filtros de categoría y fechas de la lista de operaciones"""
 
+    def filter_queryset(self, queryset):
         # Aplicar filtros
         category_id = self.request.GET.get("category")
         start_date = self.request.GET.get("start_date")
@@ -37,23 +40,84 @@ class OperationListView(LoginRequiredMixin, ListView):
 
         return queryset
 
+
+class OperationListView(
+    LoginRequiredMixin, UserFragmentCacheMixin, OperationFilterMixin, ListView
+):
+    model = Operation
+    paginate_by = 10
+    template_name = "operation_list.html"
+
+    def get_queryset(self):
+        return self.filter_queryset(
+            Operation.objects.filter(user=self.request.user).select_related("category")
+        )
+
+    @property
+    def keyset_pagination(self):
+        # La paginación por número de página (?page=) se mantiene como alternativa
+        return self.page_kwarg not in self.request.GET
+
+    @cached_property
+    def summary(self):
+        """Totales de la lista, guardados en caché hasta que cambien los datos"""
+        return self.get_cached_fragment(
+            "operation_summary",
+            self.get_summary,
+            self.keyset_pagination,
+            *(
+                self.request.GET.get(key, "")
+                for key in ("category", "start_date", "end_date")
+            ),
+        )
+
+    def get_summary(self):
+        """Totales de gastos e ingresos, y el número de operaciones si hace falta"""
+        if self.keyset_pagination:
+            # Solo hay filtros de fecha y categoría, así que los totales salen
+            # de los datos preagregados por día y categoría
+            return self.filter_queryset(
+                DailyRollup.objects.filter(user=self.request.user)
+            ).aggregate(
+                expenses_total=Sum("total_amount", filter=Q(type="gasto")),
+                income_total=Sum("total_amount", filter=Q(type="ingreso")),
+            )
+
+        # Un único agregado condicional que también da el número de operaciones
+        return (
+            self.get_queryset()
+            .order_by()
+            .aggregate(
+                count=Count("id"),
+                expenses_total=Sum("amount", filter=Q(type="gasto")),
+                income_total=Sum("amount", filter=Q(type="ingreso")),
+            )
+        )
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator = super().get_paginator(queryset, per_page, **kwargs)
+        # Evita el COUNT(*) del paginador, el número ya viene con los totales
+        paginator.count = self.summary["count"]
+        return paginator
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        queryset = self.get_queryset()
+        context["keyset_pagination"] = self.keyset_pagination
 
         # Separar gastos e ingresos basados en el tipo de categoría
-        expenses_total = (
-            queryset.filter(category__type="gasto").aggregate(Sum("amount"))[
-                "amount__sum"
-            ]
-            or 0
-        )
-        income_total = (
-            queryset.filter(category__type="ingreso").aggregate(Sum("amount"))[
-                "amount__sum"
-            ]
-            or 0
-        )
+        expenses_total = self.summary["expenses_total"] or 0
+        income_total = self.summary["income_total"] or 0
 
         # Agregar resúmenes al contexto
         context["expenses_total"] = expenses_total
@@ -73,6 +137,40 @@ class OperationListView(LoginRequiredMixin, ListView):
         return context
 
 
+class Echo:
+    """Buffer de escritura que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, value):
+        return value
+
+
+class OperationExportView(LoginRequiredMixin, OperationFilterMixin, View):
+    """Exporta a CSV las operaciones filtradas sin cargarlas en memoria"""
+
+    chunk_size = 2000
+    header = ["Fecha", "Categoría", "Tipo", "Descripción", "Monto"]
+
+    def get(self, request, *args, **kwargs):
+        rows = (
+            self.filter_queryset(Operation.objects.filter(user=request.user))
+            .order_by("-date", "-created_at", "-id")
+            .values_list("date", "category__name", "type", "description", "amount")
+        )
+        # The body is read after the middleware leaves the shard of the user,
+        # bind the queryset to its database while it is still known
+        rows = rows.using(rows.db)
+        writer = csv.writer(Echo())
+
+        def stream():
+            yield writer.writerow(self.header)
+            for row in rows.iterator(chunk_size=self.chunk_size):
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(stream(), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="operaciones.csv"'
+        return response
+
+
 class OperationDetailView(LoginRequiredMixin, DetailView):
     model = Operation
     template_name = "operation_detail.html"
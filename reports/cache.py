@@ -0,0 +1,203 @@
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from home_budget.routers import use_primary
+from .models import UserDataVersion
+
+
+def get_data_version(user):
+    """Current data version of a user, 0 if they never wrote anything"""
+    version = (
+        UserDataVersion.objects.filter(user=user)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached report of a user by moving to a new version"""
+    updated = UserDataVersion.objects.filter(user_id=user_id).update(
+        version=F("version") + 1
+    )
+    if not updated:
+        try:
+            using = router.db_for_write(UserDataVersion, user_id=user_id)
+            with transaction.atomic(using=using):
+                UserDataVersion.objects.create(user_id=user_id, version=1)
+        except IntegrityError:
+            # Another writer created the row first
+            UserDataVersion.objects.filter(user_id=user_id).update(
+                version=F("version") + 1
+            )
+
+
+def make_report_cache_key(user_id, name, period, version):
+    """Cache key for a report of a user, period and data version"""
+    period_key = ":".join(str(part) for part in period)
+    return f"reports:{name}:{user_id}:{period_key}:v{version}"
+
+
+def get_cached_report(user, name, period, compute, timeout=None):
+    """Return the cached context of a report, computing it on a miss
+
+    The data version is read from the database so every worker and node
+    agrees on it; the computed context is stored in the configured cache
+    backend, which also decides eviction. The context is computed on the
+    primary, like the version. The timeout defaults to REPORT_CACHE_TIMEOUT.
+
+    Dict contexts also get report_cache_key and report_cache_timeout, so
+    templates can cache their rendered widgets with {% cache %} under the
+    same user, period and data version.
+    """
+    if timeout is None:
+        timeout = settings.REPORT_CACHE_TIMEOUT
+
+    key = make_report_cache_key(user.pk, name, period, get_data_version(user))
+    context = cache.get(key)
+    if context is None:
+        with use_primary():
+            context = compute()
+        cache.set(key, context, timeout)
+    if isinstance(context, dict):
+        context["report_cache_key"] = key
+        context["report_cache_timeout"] = timeout
+    return context
+
+
+def get_cached_fragment(user, name, key_parts, compute, timeout=None):
+    """Return a cached value of a user, computing it on a miss
+
+    The key holds the data version of the user, so any write of theirs
+    makes the next read miss. key_parts are hashed, request input is safe
+    to use in them.
+    """
+    digest = hashlib.sha256(
+        ":".join(str(part) for part in key_parts).encode()
+    ).hexdigest()
+    return get_cached_report(user, name, [digest[:32]], compute, timeout=timeout)
+
+
+def cache_user_fragment(name, timeout=None):
+    """Cache what a function returns for a user until their data changes
+
+    The function takes the user first, the other positional arguments are
+    part of the cache key.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(user, *args):
+            return get_cached_fragment(
+                user, name, args, lambda: func(user, *args), timeout=timeout
+            )
+
+        return wrapper
+
+    return decorator
+
+
+class UserFragmentCacheMixin:
+    """Cache parts of the context of a view per user and data version"""
+
+    fragment_cache_timeout = None
+
+    def get_cached_fragment(self, name, compute, *key_parts):
+        return get_cached_fragment(
+            self.request.user,
+            name,
+            key_parts,
+            compute,
+            timeout=self.fragment_cache_timeout,
+        )
+
+
+def get_export_cache_dir(user_id, name, period, export_format, version):
+    """Directory of the cached export of a user, report, period and format"""
+    key = make_report_cache_key(user_id, name, period, version)
+    digest = hashlib.sha256(f"{key}:{export_format}".encode()).hexdigest()
+    return Path(settings.EXPORT_CACHE_DIR) / digest[:2] / digest
+
+
+def get_cached_export(user, name, period, export_format, render):
+    """Open the cached file of an export, rendering it on a miss
+
+    render returns the rendered temporary file and its file name. Files are
+    content addressed by the data version, so a write makes later requests
+    miss and old files are only removed by the size based LRU eviction.
+    Returns the open file and its file name.
+    """
+    entry = get_export_cache_dir(
+        user.pk, name, period, export_format, get_data_version(user)
+    )
+    cached = _open_cached_export(entry)
+    if cached is not None:
+        return cached
+
+    with use_primary():
+        output, filename = render()
+    entry.mkdir(parents=True, exist_ok=True)
+    with output, tempfile.NamedTemporaryFile(
+        dir=entry, prefix=".", delete=False
+    ) as temporary:
+        shutil.copyfileobj(output, temporary)
+    path = entry / filename
+    os.replace(temporary.name, path)
+
+    cached = open(path, "rb")
+    evict_cached_exports()
+    return cached, filename
+
+
+def find_cached_export(user, name, period, export_format):
+    """Open the cached file of an export and its file name, None on a miss"""
+    entry = get_export_cache_dir(
+        user.pk, name, period, export_format, get_data_version(user)
+    )
+    return _open_cached_export(entry)
+
+
+def _open_cached_export(entry):
+    try:
+        path = next(p for p in entry.iterdir() if not p.name.startswith("."))
+        cached = open(path, "rb")
+        # The modification time orders the files for the LRU eviction
+        os.utime(path)
+        return cached, path.name
+    except (FileNotFoundError, StopIteration):
+        return None
+
+
+def evict_cached_exports(max_size=None):
+    """Delete the least recently used exports until the cache fits its size"""
+    if max_size is None:
+        max_size = settings.EXPORT_CACHE_MAX_SIZE
+
+    files = []
+    for path in Path(settings.EXPORT_CACHE_DIR).glob("*/*/*"):
+        if path.name.startswith("."):
+            # Export still being written
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total_size <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+        total_size -= size
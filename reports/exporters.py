@@ -0,0 +1,215 @@
+"""Export backends by format
+
+Each backend renders a list of row dicts to a temporary file, returned open
+at its start and deleted once closed. Heavy libraries are imported when a
+backend is first used, so workers that never export do not load them.
+"""
+
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from itertools import groupby
+from xml.sax.saxutils import escape
+from django.core.serializers.json import DjangoJSONEncoder
+
+PDF_TABLE_CHUNK_ROWS = 200
+PDF_FONT_SIZE = 10
+PDF_CELL_PADDING = 12
+
+EXPORTERS = {}
+
+
+class Exporter:
+    """Export format with the file extension and content type it produces"""
+
+    def __init__(self, name, content_type, render, extension=None):
+        self.name = name
+        self.extension = extension or name
+        self.content_type = content_type
+        self.render = render
+
+
+def register_exporter(name, content_type, extension=None, aliases=()):
+    """Register the decorated function as the backend of an export format"""
+
+    def decorator(render):
+        exporter = Exporter(name, content_type, render, extension)
+        for key in [name, *aliases]:
+            EXPORTERS[key] = exporter
+        return render
+
+    return decorator
+
+
+def get_exporter(name, default="pdf"):
+    """Backend of an export format, or of the default one if it is unknown"""
+    return EXPORTERS.get(name) or EXPORTERS[default]
+
+
+@register_exporter("csv", "text/csv")
+def export_to_csv(data, title=None):
+    """Export data to a CSV file"""
+    output = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    headers = list(data[0].keys()) if data else []
+    writer = csv.writer(text)
+    writer.writerow(headers)
+    for row_data in data:
+        writer.writerow(row_data.values())
+
+    text.flush()
+    text.detach()
+    output.seek(0)
+
+    return output
+
+
+@register_exporter("json", "application/json")
+def export_to_json(data, title=None):
+    """Export data to a JSON file"""
+    output = tempfile.TemporaryFile()
+    text = io.TextIOWrapper(output, encoding="utf-8")
+    json.dump(data, text, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    text.flush()
+    text.detach()
+    output.seek(0)
+
+    return output
+
+
+@register_exporter(
+    "xlsx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    aliases=["excel"],
+)
+def export_to_excel(data, sheet_name="Report"):
+    """Export data to an Excel file
+
+    The workbook is written in constant memory mode to a temporary file,
+    which is returned open at its start and is deleted once closed.
+    """
+    import xlsxwriter
+
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet(sheet_name[:31])
+
+    # Formats are created once and shared by every cell
+    formats = {
+        "header": workbook.add_format({"bold": True}),
+        "money": workbook.add_format({"num_format": "#,##0.00"}),
+        "date": workbook.add_format({"num_format": "dd/mm/yyyy"}),
+    }
+
+    # Add headers
+    headers = list(data[0].keys()) if data else []
+    for col_num, header in enumerate(headers):
+        worksheet.write_string(0, col_num, header, formats["header"])
+
+    # Add data, rows have to be written in order in constant memory mode
+    for row_num, row_data in enumerate(data, 1):
+        for col_num, value in enumerate(row_data.values()):
+            _write_cell(worksheet, row_num, col_num, value, formats)
+
+    workbook.close()
+    output.seek(0)
+
+    return output
+
+
+def _write_cell(worksheet, row, col, value, formats):
+    """Write a value with the cell type and format matching its Python type"""
+    if value is None:
+        worksheet.write_blank(row, col, None)
+    elif isinstance(value, bool):
+        worksheet.write_boolean(row, col, value)
+    elif isinstance(value, Decimal):
+        worksheet.write_number(row, col, float(value), formats["money"])
+    elif isinstance(value, (int, float)):
+        worksheet.write_number(row, col, value)
+    elif isinstance(value, (date, datetime)):
+        worksheet.write_datetime(row, col, value, formats["date"])
+    else:
+        worksheet.write_string(row, col, str(value))
+
+
+@register_exporter("pdf", "application/pdf")
+def export_to_pdf(data, title=None, chunk_size=PDF_TABLE_CHUNK_ROWS):
+    """Export data to a PDF file
+
+    Rows are laid out as one LongTable per section, split in chunks of at
+    most chunk_size rows that repeat the header row on every page. Column
+    widths are computed once, so ReportLab does not have to measure every
+    cell of every table. The PDF is written to a temporary file, which is
+    returned open at its start and is deleted once closed.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import LongTable, Paragraph, SimpleDocTemplate, Spacer
+
+    output = tempfile.TemporaryFile()
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    elements = []
+
+    if data:
+        headers = list(data[0].keys())
+        rows = [[str(item[key]) for key in headers] for item in data]
+        col_widths = _get_pdf_col_widths(headers, rows, doc.width)
+        section_style = getSampleStyleSheet()["Heading3"]
+
+        # Rows are grouped by the section in their first column
+        for section, section_rows in groupby(rows, key=lambda row: row[0]):
+            elements.append(Paragraph(escape(section), section_style))
+            section_rows = list(section_rows)
+            for i in range(0, len(section_rows), chunk_size):
+                table = LongTable(
+                    [headers] + section_rows[i : i + chunk_size],
+                    colWidths=col_widths,
+                    repeatRows=1,
+                )
+                table.setStyle(get_pdf_table_style())
+                elements.append(table)
+            elements.append(Spacer(0, 12))
+
+    doc.build(elements)
+    output.seek(0)
+
+    return output
+
+
+def _get_pdf_col_widths(headers, rows, total_width):
+    """Column widths proportional to their widest cell, fitting the page"""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    widths = []
+    for col, header in enumerate(headers):
+        width = stringWidth(header, "Helvetica-Bold", PDF_FONT_SIZE)
+        for row in rows:
+            width = max(width, stringWidth(row[col], "Helvetica", PDF_FONT_SIZE))
+        widths.append(width + PDF_CELL_PADDING)
+    scale = min(1, total_width / sum(widths))
+    return [width * scale for width in widths]
+
+
+@lru_cache(maxsize=None)
+def get_pdf_table_style():
+    """Table style shared by every PDF table, built on first use"""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+        ]
+    )
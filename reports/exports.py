@@ -0,0 +1,212 @@
+from .services import AnnualReport, MonthlyReport
+
+
+def get_monthly_export(user, year, month):
+    """Rows, sheet title and file name of the monthly report export"""
+    # Monthly figures shared with the monthly report page
+    report = MonthlyReport(user, year, month)
+    currency = user.userprofile.currency
+    month_name = report.month_name
+
+    monthly_expenses = report.monthly_expenses
+    monthly_income = report.monthly_income
+    monthly_balance = report.monthly_balance
+
+    # Format data for export
+    report_data = []
+
+    # Summary row
+    report_data.append(
+        {
+            "Sección": "Resumen Mensual",
+            "Concepto": "Mes y año",
+            "Valor": f"{month_name} {year}",
+            "Adicional": "",
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Mensual",
+            "Concepto": "Ingresos",
+            "Valor": monthly_income,
+            "Adicional": currency,
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Mensual",
+            "Concepto": "Gastos",
+            "Valor": monthly_expenses,
+            "Adicional": currency,
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Mensual",
+            "Concepto": "Balance",
+            "Valor": monthly_balance,
+            "Adicional": currency,
+        }
+    )
+
+    # Category breakdown
+    for category in report.expenses_by_category:
+        report_data.append(
+            {
+                "Sección": "Gastos por Categoría",
+                "Concepto": category["category__name"],
+                "Valor": category["total"],
+                "Adicional": (
+                    f"{category['percentage']:.1f}% del total"
+                    if monthly_expenses > 0
+                    else "0.0%"
+                ),
+            }
+        )
+
+    # Daily expenses
+    for day_data in report.daily_totals:
+        if day_data["expenses"] is None:
+            continue
+        report_data.append(
+            {
+                "Sección": "Gastos Diarios",
+                "Concepto": day_data["date"].strftime("%d/%m/%Y"),
+                "Valor": day_data["expenses"],
+                "Adicional": currency,
+            }
+        )
+
+    title = f"Reporte {month_name} {year}"
+    filename = f"Reporte_Mensual_{month_name}_{year}"
+    return report_data, title, filename
+
+
+def get_annual_export(user, year):
+    """Rows, sheet title and file name of the annual report export"""
+    # Annual figures shared with the annual report page
+    report = AnnualReport(user, year)
+    currency = user.userprofile.currency
+
+    annual_expenses = report.annual_expenses
+    annual_income = report.annual_income
+    annual_balance = report.annual_balance
+    savings_rate = report.savings_rate
+
+    # Format data for export
+    report_data = []
+
+    # Summary row
+    report_data.append(
+        {
+            "Sección": "Resumen Anual",
+            "Concepto": "Año",
+            "Valor": f"{year}",
+            "Adicional": "",
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Anual",
+            "Concepto": "Ingresos totales",
+            "Valor": annual_income,
+            "Adicional": currency,
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Anual",
+            "Concepto": "Gastos totales",
+            "Valor": annual_expenses,
+            "Adicional": currency,
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Anual",
+            "Concepto": "Balance anual",
+            "Valor": annual_balance,
+            "Adicional": currency,
+        }
+    )
+    report_data.append(
+        {
+            "Sección": "Resumen Anual",
+            "Concepto": "Tasa de ahorro",
+            "Valor": f"{savings_rate:.1f}%",
+            "Adicional": "",
+        }
+    )
+
+    # Category breakdown
+    for category in report.expenses_by_category:
+        report_data.append(
+            {
+                "Sección": "Gastos por Categoría",
+                "Concepto": category["category__name"],
+                "Valor": category["total"],
+                "Adicional": (
+                    f"{category['percentage']:.1f}% del total"
+                    if annual_expenses > 0
+                    else "0.0%"
+                ),
+            }
+        )
+
+    # Monthly breakdown
+    for month_data in report.monthly_data:
+        report_data.append(
+            {
+                "Sección": "Desglose Mensual",
+                "Concepto": month_data["month_name"],
+                "Valor": f"Ingresos: {month_data['income']}",
+                "Adicional": currency,
+            }
+        )
+        report_data.append(
+            {
+                "Sección": "Desglose Mensual",
+                "Concepto": month_data["month_name"],
+                "Valor": f"Gastos: {month_data['expenses']}",
+                "Adicional": currency,
+            }
+        )
+        report_data.append(
+            {
+                "Sección": "Desglose Mensual",
+                "Concepto": month_data["month_name"],
+                "Valor": f"Balance: {month_data['balance']}",
+                "Adicional": currency,
+            }
+        )
+
+    # Quarterly breakdown
+    for quarter_data in report.quarterly_data:
+        report_data.append(
+            {
+                "Sección": "Desglose Trimestral",
+                "Concepto": f"Trimestre {quarter_data['number']}",
+                "Valor": f"Ingresos: {quarter_data['income']}",
+                "Adicional": currency,
+            }
+        )
+        report_data.append(
+            {
+                "Sección": "Desglose Trimestral",
+                "Concepto": f"Trimestre {quarter_data['number']}",
+                "Valor": f"Gastos: {quarter_data['expenses']}",
+                "Adicional": currency,
+            }
+        )
+        report_data.append(
+            {
+                "Sección": "Desglose Trimestral",
+                "Concepto": f"Trimestre {quarter_data['number']}",
+                "Valor": f"Balance: {quarter_data['balance']}",
+                "Adicional": currency,
+            }
+        )
+
+    title = f"Reporte Anual {year}"
+    filename = f"Reporte_Anual_{year}"
+    return report_data, title, filename
@@ -0,0 +1,143 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from home_budget.sharding import get_user_shard, use_shard
+from django.utils import timezone
+from .cache import get_cached_export
+from .exporters import get_exporter
+from .exports import get_annual_export, get_monthly_export
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# Rows, title and file name of each report type from the job parameters
+EXPORT_BUILDERS = {
+    "monthly": lambda user, params: get_monthly_export(
+        user, params["year"], params["month"]
+    ),
+    "annual": lambda user, params: get_annual_export(user, params["year"]),
+}
+
+# Period of each report type in the export cache, as the export views key it
+EXPORT_PERIODS = {
+    "monthly": lambda params: [params["year"], params["month"]],
+    "annual": lambda params: [params["year"]],
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool of the in-process export worker, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export"
+            )
+        return _executor
+
+
+def enqueue_export(user, report_type, export_format, params):
+    """Store an export job and wake the worker once it is committed"""
+    job = ExportJob.objects.create(
+        user=user, report_type=report_type, format=export_format, params=params
+    )
+    transaction.on_commit(lambda: get_executor().submit(run_pending_jobs))
+    return job
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, or None"""
+    pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING)
+    while True:
+        job_id = pending.order_by("created_at").values_list("id", flat=True).first()
+        if job_id is None:
+            return None
+        # Only one worker wins the update when several claim the same job
+        claimed = pending.filter(id=job_id).update(
+            status=ExportJob.STATUS_RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            # The profile is read apart, it can live on another shard
+            return ExportJob.objects.select_related("user").get(id=job_id)
+
+
+def requeue_stale_jobs():
+    """Queue again the running jobs older than EXPORT_JOB_TIMEOUT
+
+    Their worker stopped before finishing them, for example on a restart.
+    Returns the number of requeued jobs.
+    """
+    started_before = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING, started_at__lt=started_before
+    ).update(status=ExportJob.STATUS_PENDING, started_at=None)
+
+
+def delete_expired_jobs():
+    """Delete the jobs finished more than EXPORT_JOB_RETENTION ago
+
+    Their files are removed by the post_delete receiver of ExportJob.
+    Returns the number of deleted jobs.
+    """
+    finished_before = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_RETENTION)
+    deleted, _ = ExportJob.objects.filter(
+        status__in=[ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED],
+        finished_at__lt=finished_before,
+    ).delete()
+    return deleted
+
+
+def run_pending_jobs():
+    """Run pending export jobs until the queue is empty"""
+    try:
+        requeue_stale_jobs()
+        delete_expired_jobs()
+        while True:
+            job = claim_next_job()
+            if job is None:
+                break
+            run_job(job)
+    finally:
+        # Worker threads do not go through the request cycle that closes them
+        connections.close_all()
+
+
+def run_job(job):
+    """Render the export of a claimed job and store the file"""
+    try:
+        exporter = get_exporter(job.format)
+        with use_shard(get_user_shard(job.user_id)):
+            # Shares the disk cache with the direct downloads
+            output, filename = get_cached_export(
+                job.user,
+                job.report_type,
+                EXPORT_PERIODS[job.report_type](job.params),
+                exporter.name,
+                lambda: render_export(job, exporter),
+            )
+        with output:
+            job.file.save(filename, File(output), save=False)
+        job.status = ExportJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("Export job %s failed", job.pk)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["file", "status", "error", "finished_at"])
+
+
+def render_export(job, exporter):
+    """Render the export of a job, returns the temporary file and its name"""
+    report_data, title, filename = EXPORT_BUILDERS[job.report_type](
+        job.user, job.params
+    )
+    output = exporter.render(report_data, title)
+    return output, f"{filename}.{exporter.extension}"
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+from django.core.management.base import BaseCommand
+
+# Loads the project the way a fresh worker does and reports what it cost
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import home_budget.urls
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+HEAVY_MODULES = ["reportlab", "xlsxwriter"]
+
+
+class Command(BaseCommand):
+    help = "Measure the import time and memory of a cold worker start"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=5,
+            help="Number of fresh interpreters to start (default 5)",
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        for _ in range(options["runs"]):
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT % HEAVY_MODULES],
+                capture_output=True,
+                check=True,
+                env=os.environ.copy(),
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+        times = sorted(result["seconds"] * 1000 for result in results)
+        rss = max(result["max_rss_kb"] for result in results) / 1024
+        loaded = sorted({name for result in results for name in result["loaded"]})
+
+        self.stdout.write(
+            f"Startup over {len(results)} runs: "
+            f"min {times[0]:.0f} ms, median {times[len(times) // 2]:.0f} ms, "
+            f"max {times[-1]:.0f} ms"
+        )
+        self.stdout.write(f"Peak RSS: {rss:.1f} MB")
+        if loaded:
+            self.stdout.write(
+                self.style.WARNING(f"Loaded at startup: {', '.join(loaded)}")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("No export library is loaded at startup")
+            )
@@ -0,0 +1,98 @@
+import re
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from categories.models import Category
+from operations.models import Operation
+from reports.utils import (
+    get_daily_totals,
+    get_expense_trend,
+    get_expenses_by_category,
+    get_totals_by_category,
+)
+
+FULL_SCAN_PATTERNS = {
+    # "SCAN table" without an index; "SEARCH" and "SCAN ... USING INDEX" are fine
+    "sqlite": re.compile(r"\bSCAN (?!CONSTANT\b)(\w+)(?! USING)(?:\s|$)"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the main report queries and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Explain the queries of the user with this username "
+            "(defaults to the first user)",
+        )
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f"Query plan checks are not supported on {connection.vendor}"
+            )
+
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+        else:
+            user = User.objects.order_by("pk").first()
+        if user is None:
+            raise CommandError("No user found to explain the queries for")
+
+        today = timezone.now().date()
+        start_date = date(today.year - 1, today.month, 1)
+        end_date = today
+
+        queries = {
+            "daily totals": get_daily_totals(user, start_date, end_date),
+            "totals by category": get_totals_by_category(user, start_date, end_date),
+            "expenses by category": get_expenses_by_category(
+                user, start_date, end_date
+            ),
+            "expense trend": get_expense_trend(user, start_date, end_date),
+            "operation list": Operation.objects.filter(user=user).order_by(
+                "-date", "-created_at"
+            ),
+            "operation list by type": Operation.objects.filter(
+                user=user,
+                date__gte=start_date,
+                date__lte=end_date,
+                type="gasto",
+            ),
+            "categories by type": Category.objects.filter(user=user, type="gasto"),
+        }
+
+        failures = []
+        for name, queryset in queries.items():
+            plan = self.explain(queryset)
+            tables = sorted(set(pattern.findall(plan)))
+            if tables:
+                failures.append(name)
+                self.stdout.write(
+                    self.style.ERROR(f"{name}: full scan on {', '.join(tables)}")
+                )
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: OK"))
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} queries fall back to a full table scan: "
+                f"{', '.join(failures)}"
+            )
+
+    def explain(self, queryset):
+        if connection.vendor != "postgresql":
+            return queryset.explain()
+
+        # Small tables make sequential scans look cheap; only accept a
+        # sequential scan when no index can serve the query at all
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
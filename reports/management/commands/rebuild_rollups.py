@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from home_budget.sharding import get_user_shard, use_shard
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily operation rollups from raw operations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Only rebuild the rollups of the user with this username",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        if user is not None:
+            shards = [get_user_shard(user.pk)]
+        else:
+            shards = settings.DATABASE_SHARDS
+
+        created = 0
+        for shard in shards:
+            with use_shard(shard):
+                created += rebuild_rollups(user=user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} rollup rows"))
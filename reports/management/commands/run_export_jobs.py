@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from reports.jobs import run_pending_jobs
+from reports.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Render pending background exports, for example after a restart"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requeue-running",
+            action="store_true",
+            help="Queue again the jobs left running by a stopped worker",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_running"]:
+            requeued = ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING).update(
+                status=ExportJob.STATUS_PENDING, started_at=None
+            )
+            self.stdout.write(f"Requeued {requeued} running jobs")
+
+        pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).count()
+        run_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Processed {pending} export jobs"))
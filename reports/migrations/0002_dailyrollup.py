@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-18 18:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Operation = apps.get_model('operations', 'Operation')
+    DailyRollup = apps.get_model('reports', 'DailyRollup')
+
+    totals = (
+        Operation.objects.filter(category__isnull=False)
+        .values('user_id', 'date', 'category_id', 'category__type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                user_id=item['user_id'],
+                date=item['date'],
+                category_id=item['category_id'],
+                type=item['category__type'],
+                total_amount=item['total'],
+                operation_count=item['count'],
+            )
+            for item in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('operations', '0002_operation_delete_expense'),
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('gasto', 'Gasto'), ('ingreso', 'Ingreso')], max_length=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('operation_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='categories.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+                'ordering': ['date'],
+                'unique_together': {('user', 'date', 'category', 'type')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
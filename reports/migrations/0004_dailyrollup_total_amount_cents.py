@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+import home_budget.fields
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+from django.db.models.functions import Cast, Round
+
+
+def amount_to_cents(apps, schema_editor):
+    DailyRollup = apps.get_model('reports', 'DailyRollup')
+    DailyRollup.objects.update(
+        total_amount_cents=Cast(Round(F('total_amount') * 100), models.BigIntegerField())
+    )
+
+
+def cents_to_amount(apps, schema_editor):
+    DailyRollup = apps.get_model('reports', 'DailyRollup')
+    DailyRollup.objects.update(
+        total_amount=ExpressionWrapper(
+            F('total_amount_cents') / 100.0,
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_userdataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='total_amount_cents',
+            field=home_budget.fields.MoneyField(max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.RunPython(amount_to_cents, cents_to_amount),
+        migrations.RemoveField(
+            model_name='dailyrollup',
+            name='total_amount',
+        ),
+        migrations.RenameField(
+            model_name='dailyrollup',
+            old_name='total_amount_cents',
+            new_name='total_amount',
+        ),
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='total_amount',
+            field=home_budget.fields.MoneyField(default=0, max_digits=14),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 19:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('month', 'Month'), ('year', 'Year')], max_length=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Period Snapshot',
+                'verbose_name_plural': 'Period Snapshots',
+                'ordering': ['-start_date'],
+                'indexes': [models.Index(fields=['user', 'end_date'], name='snapshot_user_end_idx')],
+                'unique_together': {('user', 'period', 'start_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+def rename_excel_format(apps, schema_editor):
+    ExportJob = apps.get_model('reports', 'ExportJob')
+    ExportJob.objects.filter(format='excel').update(format='xlsx')
+
+
+def restore_excel_format(apps, schema_editor):
+    ExportJob = apps.get_model('reports', 'ExportJob')
+    ExportJob.objects.filter(format='xlsx').update(format='excel')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_periodsnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='format',
+            field=models.CharField(choices=[('xlsx', 'Excel'), ('pdf', 'PDF'), ('csv', 'CSV'), ('json', 'JSON')], max_length=10),
+        ),
+        migrations.RunPython(rename_excel_format, restore_excel_format),
+    ]
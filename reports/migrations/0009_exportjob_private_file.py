@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 20:08
+
+import os
+import shutil
+import uuid
+
+import reports.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_files_out_of_media(apps, schema_editor):
+    """Move the files of existing jobs from MEDIA_ROOT to EXPORT_JOB_DIR"""
+    ExportJob = apps.get_model('reports', 'ExportJob')
+    jobs = ExportJob.objects.using(schema_editor.connection.alias)
+    for pk, user_id, name in jobs.exclude(file='').values_list('pk', 'user_id', 'file'):
+        source = os.path.join(settings.MEDIA_ROOT, name)
+        if not os.path.exists(source):
+            continue
+        new_name = f'{user_id}/{uuid.uuid4().hex}/{os.path.basename(name)}'
+        target = os.path.join(settings.EXPORT_JOB_DIR, new_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+        jobs.filter(pk=pk).update(file=new_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_user_without_db_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=reports.models.get_export_job_storage, upload_to=reports.models.export_job_path),
+        ),
+        migrations.RunPython(
+            move_files_out_of_media,
+            migrations.RunPython.noop,
+            hints={'model_name': 'exportjob'},
+        ),
+    ]
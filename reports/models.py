@@ -1,6 +1,13 @@
+import os
+import uuid
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
+from categories.models import Category
+from home_budget.fields import MoneyField
+from home_budget.sharding import ShardedQuerySet
 
 
 class SavedReport(models.Model):
@@ -12,7 +19,10 @@ class SavedReport(models.Model):
     ]
 
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="saved_reports"
+        User,
+        on_delete=models.CASCADE,
+        related_name="saved_reports",
+        db_constraint=False,
     )
     name = models.CharField(max_length=100)
     report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
@@ -23,6 +33,8 @@ class SavedReport(models.Model):
     # Parámetros de filtro guardados en formato JSON
     filters = models.JSONField(default=dict, blank=True)
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
         verbose_name = _("Saved Report")
@@ -30,3 +42,172 @@ class SavedReport(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.get_report_type_display()})"
+
+
+class DailyRollup(models.Model):
+    """Pre-aggregated operation totals per user, day and category"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="daily_rollups",
+        db_constraint=False,
+    )
+    date = models.DateField()
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="daily_rollups"
+    )
+    type = models.CharField(max_length=10, choices=Category.TYPE_CHOICES)
+    total_amount = MoneyField(max_digits=14, default=0)
+    operation_count = models.PositiveIntegerField(default=0)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["date"]
+        verbose_name = _("Daily Rollup")
+        verbose_name_plural = _("Daily Rollups")
+        unique_together = ["user", "date", "category", "type"]
+
+    def __str__(self):
+        return f"{self.user} - {self.category} ({self.date}): {self.total_amount}"
+
+
+class UserDataVersion(models.Model):
+    """Counter bumped on every write that can change a user's reports"""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="data_version",
+        db_constraint=False,
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("User Data Version")
+        verbose_name_plural = _("User Data Versions")
+
+    def __str__(self):
+        return f"{self.user} (v{self.version})"
+
+
+class ExportJobStorage(FileSystemStorage):
+    """Files of the export jobs in EXPORT_JOB_DIR, never served as media"""
+
+    @property
+    def base_location(self):
+        return settings.EXPORT_JOB_DIR
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+_export_job_storage = ExportJobStorage()
+
+
+def get_export_job_storage():
+    return _export_job_storage
+
+
+def export_job_path(instance, filename):
+    # Carpeta del usuario con un nombre imposible de adivinar; el archivo
+    # conserva su nombre para la descarga
+    return f"{instance.user_id}/{uuid.uuid4().hex}/{filename}"
+
+
+class ExportJob(models.Model):
+    """Report export rendered in the background and downloaded later"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_DONE, _("Done")),
+        (STATUS_FAILED, _("Failed")),
+    ]
+    REPORT_TYPES = [
+        ("monthly", _("Monthly")),
+        ("annual", _("Annual")),
+    ]
+    FORMATS = [
+        ("xlsx", "Excel"),
+        ("pdf", "PDF"),
+        ("csv", "CSV"),
+        ("json", "JSON"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
+    format = models.CharField(max_length=10, choices=FORMATS)
+    # Periodo del reporte, por ejemplo {"year": 2025, "month": 3}
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING
+    )
+    file = models.FileField(
+        upload_to=export_job_path, storage=get_export_job_storage, blank=True
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = _("Export Job")
+        verbose_name_plural = _("Export Jobs")
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="exportjob_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.get_report_type_display()} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class PeriodSnapshot(models.Model):
+    """Frozen report figures of a closed month or year"""
+
+    PERIOD_MONTH = "month"
+    PERIOD_YEAR = "year"
+    PERIOD_CHOICES = [
+        (PERIOD_MONTH, _("Month")),
+        (PERIOD_YEAR, _("Year")),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="period_snapshots",
+        db_constraint=False,
+    )
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # Cifras del reporte tal como las genera snapshot_data()
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-start_date"]
+        verbose_name = _("Period Snapshot")
+        verbose_name_plural = _("Period Snapshots")
+        unique_together = ["user", "period", "start_date"]
+        indexes = [
+            models.Index(fields=["user", "end_date"], name="snapshot_user_end_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.get_period_display()} {self.start_date}"
@@ -0,0 +1,82 @@
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, Sum, Value
+from home_budget.fields import MoneyField
+from operations.models import Operation
+from .models import DailyRollup
+
+
+def apply_to_rollup(user_id, date, category_id, type, amount, count):
+    """Add amount and count to the rollup row of a user, day and category"""
+    if category_id is None or type is None:
+        # Operations without category never show up in reports
+        return
+    if not amount and not count:
+        return
+
+    # The amount has to go through the field to be added as cents
+    amount_value = Value(amount, output_field=MoneyField())
+    rollup = DailyRollup.objects.filter(
+        user_id=user_id, date=date, category_id=category_id, type=type
+    )
+    using = router.db_for_write(DailyRollup, user_id=user_id)
+
+    with transaction.atomic(using=using):
+        updated = rollup.update(
+            total_amount=F("total_amount") + amount_value,
+            operation_count=F("operation_count") + count,
+        )
+        if not updated:
+            try:
+                with transaction.atomic(using=using):
+                    DailyRollup.objects.create(
+                        user_id=user_id,
+                        date=date,
+                        category_id=category_id,
+                        type=type,
+                        total_amount=amount,
+                        operation_count=count,
+                    )
+            except IntegrityError:
+                # Another writer created the row first
+                rollup.update(
+                    total_amount=F("total_amount") + amount_value,
+                    operation_count=F("operation_count") + count,
+                )
+
+        if count < 0:
+            rollup.filter(operation_count__lte=0).delete()
+
+
+def rebuild_rollups(user=None, batch_size=1000):
+    """Rebuild rollup rows from raw operations, for one user or all of them"""
+    operations = Operation.objects.filter(category__isnull=False, type__isnull=False)
+    rollups = DailyRollup.objects.all()
+
+    if user is not None:
+        operations = operations.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    totals = (
+        operations.values("user_id", "date", "category_id", "type")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+
+    with transaction.atomic(using=router.db_for_write(DailyRollup)):
+        rollups.delete()
+        created = DailyRollup.objects.bulk_create(
+            (
+                DailyRollup(
+                    user_id=item["user_id"],
+                    date=item["date"],
+                    category_id=item["category_id"],
+                    type=item["type"],
+                    total_amount=item["total"],
+                    operation_count=item["count"],
+                )
+                for item in totals.iterator()
+            ),
+            batch_size=batch_size,
+        )
+
+    return len(created)
@@ -0,0 +1,368 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from .models import DailyRollup
+from .utils import (
+    get_daily_totals,
+    get_expenses_by_category,
+    get_month_bounds,
+    get_top_categories_by_period,
+    shift_month,
+)
+
+
+class AnnualReport:
+    """Annual figures computed once and shared by the annual page and its export
+
+    Month x type totals for the requested year and the previous ones come from
+    a single grouped query; annual totals, quarters and the year over year
+    comparison are derived from that result in Python.
+    """
+
+    def __init__(self, user, year, comparison_years=3, snapshot=None):
+        self.user = user
+        self.year = year
+        self.comparison_years = comparison_years
+        self.start_date = date(year, 1, 1)
+        self.end_date = date(year, 12, 31)
+
+        self._expenses_by_category = None
+        self._top_categories_by_month = None
+        if snapshot is not None:
+            self._load_snapshot(snapshot)
+        else:
+            self._totals = self._get_monthly_totals()
+
+        self.annual_expenses = self.get_year_total(year, "gasto")
+        self.annual_income = self.get_year_total(year, "ingreso")
+        self.annual_balance = self.annual_income - self.annual_expenses
+        self.savings_rate = (
+            (self.annual_balance / self.annual_income * 100)
+            if self.annual_income > 0
+            else 0
+        )
+
+        self.last_year_expenses = self.get_year_total(year - 1, "gasto")
+        self.last_year_income = self.get_year_total(year - 1, "ingreso")
+
+        self.monthly_data = self._get_monthly_data()
+        self.quarterly_data = self._get_quarterly_data()
+        self.yearly_comparison_data = self._get_yearly_comparison_data()
+
+    def _get_monthly_totals(self):
+        """Month x type totals for the report year and the comparison years"""
+        rows = (
+            DailyRollup.objects.filter(
+                user=self.user,
+                date__gte=date(self.year - max(self.comparison_years, 2) + 1, 1, 1),
+                date__lte=self.end_date,
+            )
+            .annotate(month=TruncMonth("date"))
+            .values("month", "type")
+            .annotate(total=Sum("total_amount"))
+            .order_by()
+        )
+        return {
+            (row["month"].year, row["month"].month, row["type"]): row["total"]
+            for row in rows
+        }
+
+    def get_month_total(self, year, month, type):
+        return self._totals.get((year, month, type)) or 0
+
+    def get_year_total(self, year, type):
+        return sum(
+            (self.get_month_total(year, month, type) for month in range(1, 13)), 0
+        )
+
+    def _get_monthly_data(self):
+        monthly_data = []
+        for month in range(1, 13):
+            expenses = self.get_month_total(self.year, month, "gasto")
+            income = self.get_month_total(self.year, month, "ingreso")
+            monthly_data.append(
+                {
+                    "month": month,
+                    "month_name": calendar.month_name[month],
+                    "month_abbr": calendar.month_abbr[month],
+                    "expenses": expenses,
+                    "income": income,
+                    "balance": income - expenses,
+                }
+            )
+        return monthly_data
+
+    def _get_quarterly_data(self):
+        quarterly_data = []
+        for quarter in range(1, 5):
+            months = self.monthly_data[(quarter - 1) * 3 : quarter * 3]
+            expenses = sum((item["expenses"] for item in months), 0)
+            income = sum((item["income"] for item in months), 0)
+            quarterly_data.append(
+                {
+                    "quarter": f"Q{quarter}",
+                    "number": quarter,
+                    "expenses": expenses,
+                    "income": income,
+                    "balance": income - expenses,
+                }
+            )
+        return quarterly_data
+
+    def _get_yearly_comparison_data(self):
+        yearly_comparison_data = []
+        for i in range(self.comparison_years - 1, -1, -1):
+            comparison_year = self.year - i
+            yearly_comparison_data.append(
+                {
+                    "year": str(comparison_year),
+                    "expenses": self.get_year_total(comparison_year, "gasto"),
+                    "income": self.get_year_total(comparison_year, "ingreso"),
+                }
+            )
+        return yearly_comparison_data
+
+    @property
+    def expenses_by_category(self):
+        """Annual expenses by category with their percentage of the total"""
+        if self._expenses_by_category is None:
+            self._expenses_by_category = list(
+                get_expenses_by_category(self.user, self.start_date, self.end_date)
+            )
+            for expense in self._expenses_by_category:
+                expense["percentage"] = (
+                    (expense["total"] / self.annual_expenses * 100)
+                    if self.annual_expenses > 0
+                    else 0
+                )
+        return self._expenses_by_category
+
+    @property
+    def top_categories_by_month(self):
+        """Top expense category of every month of the year"""
+        if self._top_categories_by_month is None:
+            self._top_categories_by_month = get_top_categories_by_period(
+                self.user, self.start_date, self.end_date, period="month"
+            )
+        return self._top_categories_by_month
+
+    def get_month_bounds(self, month):
+        return get_month_bounds(self.year, month)
+
+    def snapshot_data(self):
+        """JSON friendly figures the report can be rebuilt from without queries"""
+        return {
+            "totals": _dump_totals(self._totals),
+            "expenses_by_category": _dump_rows(self.expenses_by_category),
+            "top_categories": _dump_top_categories(self.top_categories_by_month),
+        }
+
+    def _load_snapshot(self, snapshot):
+        self._totals = _load_totals(snapshot["totals"])
+        self._expenses_by_category = _load_rows(snapshot["expenses_by_category"])
+        annual_expenses = self.get_year_total(self.year, "gasto")
+        for expense in self._expenses_by_category:
+            expense["percentage"] = (
+                (expense["total"] / annual_expenses * 100) if annual_expenses > 0 else 0
+            )
+        self._top_categories_by_month = _load_top_categories(snapshot["top_categories"])
+
+
+class MonthlyReport:
+    """Monthly figures computed once and shared by the monthly page and its export
+
+    Totals of the month and of the trailing months come from a single
+    month x type aggregation; the category breakdown and the daily series
+    take one query each, whatever the number of trailing months.
+    """
+
+    def __init__(self, user, year, month, trailing_months=6, snapshot=None):
+        self.user = user
+        self.year = year
+        self.month = month
+        self.month_name = calendar.month_name[month]
+        self.trailing_months = trailing_months
+        self.start_date, self.end_date = get_month_bounds(year, month)
+
+        self._expenses_by_category = None
+        self._daily_totals = None
+        self._top_categories_by_day = None
+        if snapshot is not None:
+            self._load_snapshot(snapshot)
+        else:
+            self._totals = self._get_monthly_totals()
+
+        self.monthly_expenses = self.get_month_total(0, "gasto")
+        self.monthly_income = self.get_month_total(0, "ingreso")
+        self.monthly_balance = self.monthly_income - self.monthly_expenses
+        self.savings_rate = (
+            (self.monthly_balance / self.monthly_income * 100)
+            if self.monthly_income > 0
+            else 0
+        )
+
+        self.last_month_expenses = self.get_month_total(-1, "gasto")
+        self.last_month_income = self.get_month_total(-1, "ingreso")
+
+    def _get_monthly_totals(self):
+        """Month x type totals for the report month and the trailing months"""
+        first_year, first_month = shift_month(
+            self.year, self.month, -(max(self.trailing_months, 2) - 1)
+        )
+        rows = (
+            DailyRollup.objects.filter(
+                user=self.user,
+                date__gte=date(first_year, first_month, 1),
+                date__lte=self.end_date,
+            )
+            .annotate(month=TruncMonth("date"))
+            .values("month", "type")
+            .annotate(total=Sum("total_amount"))
+            .order_by()
+        )
+        return {
+            (row["month"].year, row["month"].month, row["type"]): row["total"]
+            for row in rows
+        }
+
+    def get_month_total(self, offset, type):
+        """Total of a type for the month offset months away from the report month"""
+        year, month = shift_month(self.year, self.month, offset)
+        return self._totals.get((year, month, type)) or 0
+
+    def get_trend(self, months=None):
+        """Expenses and income of the last months, oldest first"""
+        months = months or self.trailing_months
+        trend = []
+        for offset in range(-(months - 1), 1):
+            year, month = shift_month(self.year, self.month, offset)
+            trend.append(
+                {
+                    "year": year,
+                    "month": month,
+                    "month_name": calendar.month_name[month],
+                    "expenses": self.get_month_total(offset, "gasto"),
+                    "income": self.get_month_total(offset, "ingreso"),
+                }
+            )
+        return trend
+
+    @property
+    def expenses_by_category(self):
+        """Monthly expenses by category with their percentage of the total"""
+        if self._expenses_by_category is None:
+            self._expenses_by_category = list(
+                get_expenses_by_category(self.user, self.start_date, self.end_date)
+            )
+            for expense in self._expenses_by_category:
+                expense["percentage"] = (
+                    (expense["total"] / self.monthly_expenses * 100)
+                    if self.monthly_expenses > 0
+                    else 0
+                )
+        return self._expenses_by_category
+
+    @property
+    def daily_totals(self):
+        """Expenses and income of every day of the month"""
+        if self._daily_totals is None:
+            totals = {
+                item["date"]: item
+                for item in get_daily_totals(self.user, self.start_date, self.end_date)
+            }
+            self._daily_totals = []
+            for i in range((self.end_date - self.start_date).days + 1):
+                day = self.start_date + timedelta(days=i)
+                item = totals.get(day, {})
+                self._daily_totals.append(
+                    {
+                        "date": day,
+                        "expenses": item.get("expenses"),
+                        "income": item.get("income"),
+                    }
+                )
+        return self._daily_totals
+
+    @property
+    def top_categories_by_day(self):
+        """Top expense category of every day of the month"""
+        if self._top_categories_by_day is None:
+            self._top_categories_by_day = get_top_categories_by_period(
+                self.user, self.start_date, self.end_date, period="day"
+            )
+        return self._top_categories_by_day
+
+    def snapshot_data(self):
+        """JSON friendly figures the report can be rebuilt from without queries"""
+        return {
+            "totals": _dump_totals(self._totals),
+            "expenses_by_category": _dump_rows(self.expenses_by_category),
+            "daily_totals": _dump_rows(self.daily_totals),
+            "top_categories": _dump_top_categories(self.top_categories_by_day),
+        }
+
+    def _load_snapshot(self, snapshot):
+        self._totals = _load_totals(snapshot["totals"])
+        self._expenses_by_category = _load_rows(snapshot["expenses_by_category"])
+        monthly_expenses = self.get_month_total(0, "gasto")
+        for expense in self._expenses_by_category:
+            expense["percentage"] = (
+                (expense["total"] / monthly_expenses * 100)
+                if monthly_expenses > 0
+                else 0
+            )
+        self._daily_totals = _load_rows(snapshot["daily_totals"])
+        self._top_categories_by_day = _load_top_categories(snapshot["top_categories"])
+
+
+# Keys of report rows holding amounts and dates, stored as strings in snapshots
+SNAPSHOT_DECIMAL_KEYS = {"total", "avg", "expenses", "income"}
+SNAPSHOT_DATE_KEYS = {"date", "bucket"}
+
+
+def _dump_rows(rows):
+    return [
+        {
+            key: str(value) if isinstance(value, (Decimal, date)) else value
+            for key, value in row.items()
+            if key != "percentage"
+        }
+        for row in rows
+    ]
+
+
+def _load_rows(rows):
+    loaded_rows = []
+    for row in rows:
+        row = dict(row)
+        for key in SNAPSHOT_DECIMAL_KEYS & row.keys():
+            if row[key] is not None:
+                row[key] = Decimal(row[key])
+        for key in SNAPSHOT_DATE_KEYS & row.keys():
+            if row[key] is not None:
+                row[key] = date.fromisoformat(row[key])
+        loaded_rows.append(row)
+    return loaded_rows
+
+
+def _dump_totals(totals):
+    return [
+        [year, month, type, str(total)] for (year, month, type), total in totals.items()
+    ]
+
+
+def _load_totals(totals):
+    return {(year, month, type): Decimal(total) for year, month, type, total in totals}
+
+
+def _dump_top_categories(top_categories):
+    return {str(bucket): _dump_rows(rows) for bucket, rows in top_categories.items()}
+
+
+def _load_top_categories(top_categories):
+    return {
+        date.fromisoformat(bucket): _load_rows(rows)
+        for bucket, rows in top_categories.items()
+    }
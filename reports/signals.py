@@ -0,0 +1,152 @@
+import os
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import UserProfile
+from categories.models import Category
+from operations.models import Operation
+from .cache import bump_data_version
+from .models import DailyRollup, ExportJob, UserDataVersion
+from .rollups import apply_to_rollup
+from .snapshots import invalidate_period_snapshots
+
+
+@receiver(pre_save, sender=Operation)
+def remember_previous_operation(sender, instance, using, **kwargs):
+    """Keep the stored state of an operation so updates can be reverted"""
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = (
+            Operation.objects.using(using)
+            .filter(pk=instance.pk)
+            .values("user_id", "date", "category_id", "type", "amount")
+            .first()
+        )
+
+
+def get_saved_amount(instance):
+    """Amount of an operation as stored, it keeps an assigned str or float"""
+    return Operation._meta.get_field("amount").to_python(instance.amount)
+
+
+@receiver(post_save, sender=Operation)
+def update_rollup_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, "_rollup_previous", None)
+    type = instance.type
+    amount = get_saved_amount(instance)
+
+    if previous and (
+        previous["user_id"],
+        previous["date"],
+        previous["category_id"],
+        previous["type"],
+    ) == (instance.user_id, instance.date, instance.category_id, type):
+        # Same rollup row, only the amount may have changed
+        apply_to_rollup(
+            instance.user_id,
+            instance.date,
+            instance.category_id,
+            type,
+            amount - previous["amount"],
+            0,
+        )
+        return
+
+    if previous:
+        apply_to_rollup(
+            previous["user_id"],
+            previous["date"],
+            previous["category_id"],
+            previous["type"],
+            -previous["amount"],
+            -1,
+        )
+
+    apply_to_rollup(
+        instance.user_id,
+        instance.date,
+        instance.category_id,
+        type,
+        amount,
+        1,
+    )
+
+
+@receiver(post_delete, sender=Operation)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    apply_to_rollup(
+        instance.user_id,
+        instance.date,
+        instance.category_id,
+        instance.type,
+        -get_saved_amount(instance),
+        -1,
+    )
+
+
+@receiver(post_save, sender=Category)
+def sync_rollup_type(sender, instance, created, using, **kwargs):
+    if not created:
+        DailyRollup.objects.using(using).filter(category=instance).exclude(
+            type=instance.type
+        ).update(type=instance.type)
+
+
+@receiver(post_save, sender=Operation)
+@receiver(post_delete, sender=Operation)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_reports(sender, instance, **kwargs):
+    # Bump after commit so no reader caches pre-write data under the new version
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+@receiver(post_delete, sender=User)
+def delete_data_version(sender, instance, **kwargs):
+    """Drop the data version of a deleted user
+
+    Runs after the bumps of the cascaded deletes, which would otherwise
+    recreate the row of a user that no longer exists.
+    """
+    user_id = instance.pk
+    transaction.on_commit(
+        lambda: UserDataVersion.objects.filter(user_id=user_id).delete()
+    )
+
+
+@receiver(post_save, sender=Operation)
+@receiver(post_delete, sender=Operation)
+def invalidate_snapshots_on_operation_write(sender, instance, **kwargs):
+    """Drop the snapshots of the closed periods a back-dated write changes"""
+    since = instance.date
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous:
+        if previous["user_id"] != instance.user_id:
+            invalidate_period_snapshots(previous["user_id"], previous["date"])
+        since = min(since, previous["date"])
+    invalidate_period_snapshots(instance.user_id, since)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_snapshots_on_category_write(sender, instance, created=False, **kwargs):
+    # Los snapshots guardan el nombre y el color de las categorías
+    if not created:
+        invalidate_period_snapshots(instance.user_id)
+
+
+@receiver(post_delete, sender=ExportJob)
+def delete_export_job_file(sender, instance, **kwargs):
+    """Remove the file of an expired or cascaded export job"""
+    if instance.file:
+        path = instance.file.path
+        instance.file.delete(save=False)
+        try:
+            # Each file has its own directory
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
@@ -0,0 +1,76 @@
+from datetime import date
+from home_budget.routers import use_primary
+from .cache import get_data_version
+from .models import PeriodSnapshot
+from .services import AnnualReport, MonthlyReport
+from .utils import get_month_bounds
+
+
+def get_monthly_report(user, today, year, month):
+    """Monthly report, read from its snapshot once the month is closed"""
+    start_date, end_date = get_month_bounds(year, month)
+    return get_period_report(
+        user,
+        today,
+        PeriodSnapshot.PERIOD_MONTH,
+        start_date,
+        end_date,
+        lambda snapshot: MonthlyReport(user, year, month, snapshot=snapshot),
+    )
+
+
+def get_annual_report(user, today, year):
+    """Annual report, read from its snapshot once the year is closed"""
+    return get_period_report(
+        user,
+        today,
+        PeriodSnapshot.PERIOD_YEAR,
+        date(year, 1, 1),
+        date(year, 12, 31),
+        lambda snapshot: AnnualReport(user, year, snapshot=snapshot),
+    )
+
+
+def get_period_report(user, today, period, start_date, end_date, build):
+    """Build a report from the snapshot of its period, storing it on a miss
+
+    Only periods that ended before today are snapshotted; back-dated writes
+    delete the snapshots they affect (see reports.signals).
+    """
+    if end_date >= today:
+        return build(None)
+
+    data = (
+        PeriodSnapshot.objects.filter(user=user, period=period, start_date=start_date)
+        .values_list("data", flat=True)
+        .first()
+    )
+    if data is not None:
+        return build(data)
+
+    version = get_data_version(user)
+    # Frozen from then on, a lagging replica would keep missing writes
+    with use_primary():
+        report = build(None)
+    data = report.snapshot_data()
+    # A write committed while computing may be missing from the report
+    if get_data_version(user) == version:
+        PeriodSnapshot.objects.update_or_create(
+            user=user,
+            period=period,
+            start_date=start_date,
+            defaults={"end_date": end_date, "data": data},
+        )
+    return report
+
+
+def invalidate_period_snapshots(user_id, since=None):
+    """Delete the snapshots of a user covering any day from since onwards
+
+    Reports also include earlier months and years for comparison, so every
+    snapshot ending on or after the changed day may hold it.
+    """
+    snapshots = PeriodSnapshot.objects.filter(user_id=user_id)
+    if since is not None:
+        snapshots = snapshots.filter(end_date__gte=since)
+    snapshots.delete()
@@ -1,3 +1,296 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from categories.models import Category
+from home_budget.routers import (
+    REPLICA_DATABASE,
+    SESSION_KEY,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    RequestRouting,
+    _request_routing,
+    use_primary,
+)
+from home_budget.sharding import sharding_enabled
+from .jobs import run_job
+from operations.models import Operation
+from .models import DailyRollup, ExportJob, PeriodSnapshot, SavedReport, UserDataVersion
+from .services import MonthlyReport
 
-# Create your tests here.
+
+# The replica only serves the report models that are not sharded
+@override_settings(DATABASE_SHARDS=["default"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.routing = RequestRouting(use_replica=True)
+        token = _request_routing.set(self.routing)
+        self.addCleanup(_request_routing.reset, token)
+
+    def test_report_reads_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(SavedReport), REPLICA_DATABASE)
+        self.assertEqual(self.router.db_for_read(DailyRollup), REPLICA_DATABASE)
+
+    def test_bookkeeping_reads_stay_on_the_primary(self):
+        for model in (UserDataVersion, PeriodSnapshot, ExportJob):
+            self.assertIsNone(self.router.db_for_read(model), model)
+
+    def test_use_primary_reads_from_the_primary_for_a_block(self):
+        with use_primary():
+            self.assertIsNone(self.router.db_for_read(SavedReport))
+        self.assertEqual(self.router.db_for_read(SavedReport), REPLICA_DATABASE)
+        self.assertFalse(self.routing.wrote)
+
+    def test_other_apps_stay_on_the_primary(self):
+        self.assertIsNone(self.router.db_for_read(Operation))
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_a_write_moves_the_request_to_the_primary(self):
+        self.assertIsNone(self.router.db_for_write(SavedReport))
+        self.assertTrue(self.routing.wrote)
+        self.assertIsNone(self.router.db_for_read(SavedReport))
+
+    def test_no_replica_outside_of_requests(self):
+        _request_routing.set(None)
+        self.assertIsNone(self.router.db_for_read(SavedReport))
+
+    def test_replica_never_gets_migrations(self):
+        self.assertFalse(self.router.allow_migrate(REPLICA_DATABASE, "reports"))
+        self.assertIsNone(self.router.allow_migrate("default", "reports"))
+
+
+@override_settings(DATABASE_SHARDS=["default"])
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.read_from = []
+
+    def get_response(self, request):
+        self.read_from.append(self.router.db_for_read(SavedReport))
+        if request.method == "POST":
+            self.router.db_for_write(SavedReport)
+        return HttpResponse()
+
+    def make_middleware(self):
+        replica = {**settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, {REPLICA_DATABASE: replica}):
+            return ReplicaRoutingMiddleware(self.get_response)
+
+    def make_request(self, method, session):
+        request = getattr(self.factory, method)("/reports/monthly/")
+        request.session = session
+        return request
+
+    def test_writes_stick_to_the_primary(self):
+        middleware = self.make_middleware()
+        session = {}
+
+        middleware(self.make_request("get", session))
+        middleware(self.make_request("post", session))
+        self.assertIn(SESSION_KEY, session)
+        middleware(self.make_request("get", session))
+
+        self.assertEqual(self.read_from, [REPLICA_DATABASE, None, None])
+
+    def test_the_sticky_window_expires(self):
+        middleware = self.make_middleware()
+        session = {SESSION_KEY: 0}
+
+        middleware(self.make_request("get", session))
+
+        self.assertEqual(self.read_from, [REPLICA_DATABASE])
+
+    def test_not_used_without_a_replica(self):
+        databases = {
+            alias: value
+            for alias, value in settings.DATABASES.items()
+            if alias != REPLICA_DATABASE
+        }
+        with mock.patch.object(settings, "DATABASES", databases):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(self.get_response)
+
+
+@skipUnless(
+    REPLICA_DATABASE in settings.DATABASES and not sharding_enabled(),
+    "Set DB_REPLICA_NAME or DB_REPLICA_HOST, without DB_SHARDS, to test "
+    "against a replica",
+)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Requests against a replica that mirrors the default test database
+
+    The rows are committed so the replica connection can read them.
+    """
+
+    # Skipped classes still open their databases, keep only configured ones
+    databases = {"default", REPLICA_DATABASE} & set(settings.DATABASES)
+
+    def setUp(self):
+        # Report contexts are cached per user id, which the rollbacks reuse
+        cache.clear()
+        self.user = User.objects.create_user("replica", password="pw")
+        self.category = Category.objects.create(
+            user=self.user, name="Food", type="gasto"
+        )
+        Operation.objects.create(
+            user=self.user, category=self.category, amount=10, date=date.today()
+        )
+        self.client.force_login(self.user)
+
+    def test_cached_reports_are_computed_on_the_primary(self):
+        with CaptureQueriesContext(connections[REPLICA_DATABASE]) as replica:
+            response = self.client.get(reverse("reports:monthly_report"))
+
+        self.assertEqual(response.status_code, 200)
+        tables = " ".join(query["sql"] for query in replica.captured_queries)
+        self.assertNotIn("reports_dailyrollup", tables)
+        self.assertNotIn("reports_userdataversion", tables)
+
+    def test_a_back_dated_write_is_in_the_rebuilt_snapshot(self):
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+        params = {"year": last_month.year, "month": last_month.month}
+        self.client.get(reverse("reports:monthly_report"), params)
+        self.assertTrue(PeriodSnapshot.objects.filter(user=self.user).exists())
+
+        # Written by another session, this one reads the replica again once
+        # the snapshot write above is no longer sticky
+        Operation.objects.create(
+            user=self.user, category=self.category, amount=5, date=last_month
+        )
+        session = self.client.session
+        del session[SESSION_KEY]
+        session.save()
+        with CaptureQueriesContext(connections[REPLICA_DATABASE]) as replica:
+            response = self.client.get(reverse("reports:monthly_report"), params)
+
+        self.assertEqual(response.status_code, 200)
+        tables = " ".join(query["sql"] for query in replica.captured_queries)
+        self.assertNotIn("reports_dailyrollup", tables)
+        data = PeriodSnapshot.objects.get(user=self.user).data
+        report = MonthlyReport(
+            self.user, last_month.year, last_month.month, snapshot=data
+        )
+        self.assertEqual(report.get_month_total(0, "gasto"), Decimal("5"))
+
+    def test_a_new_export_job_is_read_from_the_primary(self):
+        job = ExportJob.objects.create(
+            user=self.user, report_type="monthly", format="csv", params={}
+        )
+
+        response = self.client.get(reverse("reports:export_job", args=[job.pk]))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_reads_after_a_write_use_the_primary(self):
+        session = self.client.session
+        session[SESSION_KEY] = time.time() + 60
+        session.save()
+
+        with CaptureQueriesContext(connections[REPLICA_DATABASE]) as replica:
+            self.client.get(reverse("reports:monthly_report"))
+
+        self.assertEqual(replica.captured_queries, [])
+
+
+class ExportJobFileTests(TestCase):
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        job_dir = tempfile.TemporaryDirectory()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(job_dir.cleanup)
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(
+            EXPORT_JOB_DIR=job_dir.name, EXPORT_CACHE_DIR=cache_dir.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.job_dir = job_dir.name
+
+        cache.clear()
+        self.user = User.objects.create_user("owner", password="pw")
+        category = Category.objects.create(user=self.user, name="Food", type="gasto")
+        Operation.objects.create(
+            user=self.user, category=category, amount=10, date=date.today()
+        )
+        self.job = ExportJob.objects.create(
+            user=self.user,
+            report_type="annual",
+            format="csv",
+            params={"year": date.today().year},
+        )
+        run_job(self.job)
+
+    def test_files_are_kept_outside_of_media_under_a_random_name(self):
+        path = self.job.file.path
+        self.assertEqual(self.job.status, ExportJob.STATUS_DONE)
+        self.assertTrue(path.startswith(os.path.join(self.job_dir, str(self.user.pk))))
+        self.assertFalse(path.startswith(settings.MEDIA_ROOT))
+        self.assertEqual(len(self.job.file.name.split("/")[1]), 32)
+
+    def test_only_the_owner_downloads_the_file(self):
+        url = reverse("reports:download_export_job", args=[self.job.pk])
+
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Food", b"".join(response.streaming_content))
+
+        self.client.force_login(User.objects.create_user("other", password="pw"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_deleting_the_job_removes_its_directory(self):
+        directory = os.path.dirname(self.job.file.path)
+        self.job.delete()
+        self.assertFalse(os.path.exists(directory))
+
+
+class RollupTests(TestCase):
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        self.user = User.objects.create_user("rollup", password="pw")
+        category = Category.objects.create(user=self.user, name="Food", type="gasto")
+        self.operation = Operation.objects.create(
+            user=self.user, category=category, amount=10, date=date.today()
+        )
+
+    def assertRollup(self, total, count):
+        rollup = DailyRollup.objects.get(user=self.user)
+        self.assertEqual(
+            (rollup.total_amount, rollup.operation_count), (Decimal(total), count)
+        )
+
+    def test_updates_accept_every_amount_the_field_accepts(self):
+        self.operation.amount = "20.00"
+        self.operation.save()
+        self.assertRollup("20.00", 1)
+
+        self.operation.amount = 12.5
+        self.operation.save()
+        self.assertRollup("12.50", 1)
+
+    def test_deleting_an_operation_with_an_assigned_amount(self):
+        self.operation.amount = "20.00"
+        self.operation.save()
+        self.operation.delete()
+        self.assertFalse(DailyRollup.objects.filter(user=self.user).exists())
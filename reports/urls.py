@@ -8,4 +8,10 @@ urlpatterns = [
     path("annual/", views.annual_report, name="annual_report"),
     path("export-monthly/", views.export_monthly_report, name="export_monthly_report"),
     path("export-annual/", views.export_annual_report, name="export_annual_report"),
+    path("exports/<int:pk>/", views.export_job, name="export_job"),
+    path(
+        "exports/<int:pk>/download/",
+        views.download_export_job,
+        name="download_export_job",
+    ),
 ]
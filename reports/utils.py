@@ -1,14 +1,17 @@
 import calendar
-from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Avg
-from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+from datetime import date, datetime, timedelta
+from django.db import connection
+from django.db.models import Sum, Q, F, Window
+from django.db.models.functions import (
+    Round,
+    RowNumber,
+    TruncMonth,
+    TruncWeek,
+    TruncYear,
+)
 from django.utils import timezone
-from operations.models import Operation
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib import colors
-import xlsxwriter
+from home_budget.fields import MoneyField
+from .models import DailyRollup
 
 
 def get_date_range(period_type, user, year=None, month=None):
@@ -52,10 +55,32 @@ def get_date_range(period_type, user, year=None, month=None):
     return start_date, end_date
 
 
+def get_month_bounds(year, month):
+    """Get the first and last day of a month"""
+    _, last_day = calendar.monthrange(year, month)
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def shift_month(year, month, offset):
+    """Get the (year, month) that is offset months away from the given one"""
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def get_period_total(user, start_date, end_date, type):
+    """Get the total amount of an operation type for a given date range"""
+    return (
+        DailyRollup.objects.filter(
+            user=user, date__gte=start_date, date__lte=end_date, type=type
+        ).aggregate(total=Sum("total_amount"))["total"]
+        or 0
+    )
+
+
 def get_expenses_by_category(user, start_date, end_date, categories=None):
     """Get expenses grouped by category for a given date range"""
-    expenses_query = Operation.objects.filter(
-        user=user, date__gte=start_date, date__lte=end_date, category__type="gasto"
+    expenses_query = DailyRollup.objects.filter(
+        user=user, date__gte=start_date, date__lte=end_date, type="gasto"
     )
 
     if categories:
@@ -63,44 +88,133 @@ def get_expenses_by_category(user, start_date, end_date, categories=None):
 
     expenses_by_category = (
         expenses_query.values("category__name", "category__color")
-        .annotate(total=Sum("amount"), count=Count("id"), avg=Avg("amount"))
+        .annotate(
+            total=Sum("total_amount"),
+            count=Sum("operation_count"),
+            avg=_rollup_average(),
+        )
         .order_by("-total")
     )
 
     return expenses_by_category
 
 
+def get_totals_by_category(user, start_date, end_date):
+    """Get expense and income totals grouped by category in a single query"""
+    return (
+        DailyRollup.objects.filter(user=user, date__gte=start_date, date__lte=end_date)
+        .values("category__name", "category__color", "category__type")
+        .annotate(
+            total=Sum("total_amount"),
+            count=Sum("operation_count"),
+            avg=_rollup_average(),
+        )
+        .order_by("-total")
+    )
+
+
+def get_daily_totals(user, start_date, end_date):
+    """Get expense and income totals per day in a single grouped query"""
+    return (
+        DailyRollup.objects.filter(user=user, date__gte=start_date, date__lte=end_date)
+        .values("date")
+        .annotate(
+            expenses=Sum("total_amount", filter=Q(type="gasto")),
+            income=Sum("total_amount", filter=Q(type="ingreso")),
+        )
+        .order_by("date")
+    )
+
+
 def get_expense_trend(user, start_date, end_date, period="month"):
     """Get expense trend over time (weekly, monthly, or yearly)"""
-    expenses_query = Operation.objects.filter(
-        user=user, date__gte=start_date, date__lte=end_date, category__type="gasto"
+    expenses_query = DailyRollup.objects.filter(
+        user=user, date__gte=start_date, date__lte=end_date, type="gasto"
     )
 
     if period == "week":
         expenses_trend = (
             expenses_query.annotate(period=TruncWeek("date"))
             .values("period")
-            .annotate(total=Sum("amount"))
+            .annotate(total=Sum("total_amount"))
             .order_by("period")
         )
     elif period == "month":
         expenses_trend = (
             expenses_query.annotate(period=TruncMonth("date"))
             .values("period")
-            .annotate(total=Sum("amount"))
+            .annotate(total=Sum("total_amount"))
             .order_by("period")
         )
     else:  # year
         expenses_trend = (
             expenses_query.annotate(period=TruncYear("date"))
             .values("period")
-            .annotate(total=Sum("amount"))
+            .annotate(total=Sum("total_amount"))
             .order_by("period")
         )
 
     return expenses_trend
 
 
+def get_top_categories_by_period(
+    user, start_date, end_date, period="day", limit=1, type="gasto"
+):
+    """Get the top categories of every day, week or month in a single query
+
+    Returns a dict mapping the first day of each bucket to its `limit`
+    categories with the highest total, in descending order.
+    """
+    rollup_query = DailyRollup.objects.filter(
+        user=user, date__gte=start_date, date__lte=end_date, type=type
+    )
+
+    if period == "week":
+        rollup_query = rollup_query.annotate(bucket=TruncWeek("date"))
+    elif period == "month":
+        rollup_query = rollup_query.annotate(bucket=TruncMonth("date"))
+    else:  # day
+        rollup_query = rollup_query.annotate(bucket=F("date"))
+
+    totals_query = rollup_query.values(
+        "bucket", "category__name", "category__color"
+    ).annotate(total=Sum("total_amount"))
+
+    if connection.features.supports_over_clause:
+        # Rank inside the database and only fetch the winners
+        rows = (
+            totals_query.annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=[F("bucket")],
+                    order_by=[F("total").desc(), F("category__name").asc()],
+                )
+            )
+            .filter(rank__lte=limit)
+            .order_by("bucket", "rank")
+        )
+    else:
+        # Single grouped fetch ranked in Python
+        rows = totals_query.order_by("bucket", "-total", "category__name")
+
+    top_categories = {}
+    for row in rows:
+        bucket_categories = top_categories.setdefault(row["bucket"], [])
+        if len(bucket_categories) < limit:
+            bucket_categories.append(row)
+
+    return top_categories
+
+
+def _rollup_average():
+    """Average operation amount computed from rollup sums and counts"""
+    # Rounded to whole cents in the database, multiplying by 1.0 avoids the
+    # integer division of the sums
+    return Round(
+        Sum("total_amount") * 1.0 / Sum("operation_count"), output_field=MoneyField()
+    )
+
+
 def generate_chart_data(data, chart_type="pie"):
     """Generate data formatted for Chart.js"""
     if chart_type == "pie" or chart_type == "doughnut":
@@ -148,62 +262,3 @@ def generate_chart_data(data, chart_type="pie"):
         }
 
     return chart_data
-
-
-def export_to_excel(data, sheet_name="Report"):
-    """Export data to Excel file"""
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet(sheet_name)
-
-    # Add headers
-    headers = list(data[0].keys()) if data else []
-    for col_num, header in enumerate(headers):
-        worksheet.write(0, col_num, header)
-
-    # Add data
-    for row_num, row_data in enumerate(data, 1):
-        for col_num, (key, value) in enumerate(row_data.items()):
-            worksheet.write(row_num, col_num, value)
-
-    workbook.close()
-    output.seek(0)
-
-    return output
-
-
-def export_to_pdf(data):
-    """Export data to PDF file"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    # Create table data
-    if data:
-        headers = list(data[0].keys())
-        table_data = [headers]
-        for item in data:
-            table_data.append([str(item[key]) for key in headers])
-
-        # Create table
-        table = Table(table_data)
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                ]
-            )
-        )
-
-        elements.append(table)
-
-    doc.build(elements)
-    buffer.seek(0)
-
-    return buffer
@@ -1,30 +1,37 @@
 import calendar
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import (
     ListView,
 )
-from django.http import HttpResponse
+from django.http import FileResponse
 from django.utils import timezone
 from django.contrib import messages
-from django.db.models import Sum, Count, Avg, DateField
-from django.db.models.functions import Cast
-from datetime import datetime, timedelta
+from datetime import timedelta
 import json
+import os
 import pytz
 
-from .models import SavedReport
+from .models import ExportJob, SavedReport
 from .forms import ReportFilterForm, SaveReportForm
+from .cache import (
+    cache_user_fragment,
+    find_cached_export,
+    get_cached_export,
+    get_cached_report,
+)
+from .exporters import get_exporter
+from .exports import get_annual_export, get_monthly_export
+from .jobs import EXPORT_PERIODS, enqueue_export
+from .snapshots import get_annual_report, get_monthly_report
 from .utils import (
     get_date_range,
-    get_expenses_by_category,
+    get_totals_by_category,
+    get_daily_totals,
     get_expense_trend,
     generate_chart_data,
-    export_to_excel,
-    export_to_pdf,
 )
-from operations.models import Operation
 
 
 @login_required
@@ -36,6 +43,14 @@ def dashboard(request):
 
     # Get current date in user's timezone
     today = timezone.now().astimezone(current_tz).date()
+
+    context = get_dashboard_context(request.user, current_tz, today)
+    return render(request, "dashboard.html", context)
+
+
+@cache_user_fragment("dashboard")
+def get_dashboard_context(user, current_tz, today):
+    """Compute the dashboard widgets for the month of the given day"""
     start_of_month = today.replace(day=1)
     end_of_month = (start_of_month + timedelta(days=32)).replace(day=1) - timedelta(
         days=1
@@ -50,31 +65,7 @@ def dashboard(request):
     end_of_month = timezone.datetime.combine(end_of_month, timezone.datetime.max.time())
     end_of_month = current_tz.localize(end_of_month)
 
-    # Monthly totals
-    monthly_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    monthly_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    # Calculate balance
-    monthly_balance = monthly_income - monthly_expenses
-
-    # Get last month data for comparison
+    # Get last month boundaries for comparison
     last_month_end = timezone.datetime.combine(
         start_of_month.date() - timedelta(days=1), timezone.datetime.max.time()
     )
@@ -85,25 +76,28 @@ def dashboard(request):
     )
     last_month_start = current_tz.localize(last_month_start)
 
-    last_month_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_month_start,
-            date__lte=last_month_end,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    # Daily totals for last and current month in a single grouped scan
+    daily_totals = get_daily_totals(user, last_month_start.date(), end_of_month.date())
+
+    monthly_expenses = monthly_income = 0
+    last_month_expenses = last_month_income = 0
+    expense_dict = {}
+    income_dict = {}
+
+    for item in daily_totals:
+        expenses = item["expenses"] or 0
+        income = item["income"] or 0
+        if item["date"] >= start_of_month.date():
+            monthly_expenses += expenses
+            monthly_income += income
+            expense_dict[item["date"]] = expenses
+            income_dict[item["date"]] = income
+        else:
+            last_month_expenses += expenses
+            last_month_income += income
 
-    last_month_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_month_start,
-            date__lte=last_month_end,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    # Calculate balance
+    monthly_balance = monthly_income - monthly_expenses
 
     # Calculate percentage changes
     expense_change_pct = (
@@ -117,48 +111,17 @@ def dashboard(request):
         else 0
     )
 
-    # Top expense categories
-    top_expenses = get_expenses_by_category(request.user, start_of_month, end_of_month)[
-        :5
-    ]  # Get top 5
-
-    # Monthly income categories
-    income_by_category = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        )
-        .values("category__name", "category__color")
-        .annotate(total=Sum("amount"), count=Count("id"), avg=Avg("amount"))
-        .order_by("-total")
-    )
-
-    # Daily expense trend
-    daily_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        )
-        .values("date")
-        .annotate(total=Sum("amount"))
-        .order_by("date")
-    )
-
-    daily_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        )
-        .values("date")
-        .annotate(total=Sum("amount"))
-        .order_by("date")
+    # Expense and income categories in a single grouped query
+    totals_by_category = get_totals_by_category(
+        user, start_of_month.date(), end_of_month.date()
     )
+    expenses_by_category = [
+        item for item in totals_by_category if item["category__type"] == "gasto"
+    ]
+    top_expenses = expenses_by_category[:5]  # Get top 5
+    income_by_category = [
+        item for item in totals_by_category if item["category__type"] == "ingreso"
+    ]
 
     # Create daily trend data
     daily_trend_data = []
@@ -167,9 +130,6 @@ def dashboard(request):
         for i in range((end_of_month - start_of_month).days + 1)
     ]
 
-    expense_dict = {item["date"]: item["total"] for item in daily_expenses}
-    income_dict = {item["date"]: item["total"] for item in daily_income}
-
     for date in date_range:
         daily_trend_data.append(
             {
@@ -228,7 +188,7 @@ def dashboard(request):
     }
 
     # Check if user has a monthly budget
-    user_profile = request.user.userprofile
+    user_profile = user.userprofile
     monthly_budget = user_profile.monthly_budget
     budget_percentage = 0
     days_left = (end_of_month.date() - today).days
@@ -263,7 +223,7 @@ def dashboard(request):
         "end_date": end_of_month,
     }
 
-    return render(request, "dashboard.html", context)
+    return context
 
 
 @login_required
@@ -281,22 +241,21 @@ def monthly_report(request):
     month = int(request.GET.get("month", today.month))
     year = int(request.GET.get("year", today.year))
 
-    # Get month name
-    month_name = calendar.month_name[month]
-
-    # Create datetime objects for start and end of month
-    start_date = datetime(year, month, 1)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+    context = get_cached_report(
+        request.user,
+        "monthly",
+        [year, month, today],
+        lambda: get_monthly_report_context(request.user, today, year, month),
+    )
+    return render(request, "monthly_report.html", context)
 
-    # Add timezone info
-    start_of_month = timezone.datetime.combine(start_date, timezone.datetime.min.time())
-    start_of_month = current_tz.localize(start_of_month)
 
-    end_of_month = timezone.datetime.combine(end_date, timezone.datetime.max.time())
-    end_of_month = current_tz.localize(end_of_month)
+def get_monthly_report_context(user, today, year, month):
+    """Compute the monthly report of the given month"""
+    # Month summary and trailing months from a fixed number of queries, or
+    # from the snapshot of a closed month
+    report = get_monthly_report(user, today, year, month)
+    month_name = report.month_name
 
     # Generate months and years for the selector
     months = [(i, calendar.month_name[i]) for i in range(1, 13)]
@@ -306,73 +265,16 @@ def monthly_report(request):
     years = list(range(current_year - 5, current_year + 2))
 
     # Monthly totals
-    monthly_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    monthly_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    monthly_expenses = report.monthly_expenses
+    monthly_income = report.monthly_income
 
     # Calculate balance and savings rate
-    monthly_balance = monthly_income - monthly_expenses
-    savings_rate = (monthly_balance / monthly_income * 100) if monthly_income > 0 else 0
+    monthly_balance = report.monthly_balance
+    savings_rate = report.savings_rate
 
     # Get last month data for comparison
-    if month == 1:
-        last_month = 12
-        last_year = year - 1
-    else:
-        last_month = month - 1
-        last_year = year
-
-    last_month_start = datetime(last_year, last_month, 1)
-    if last_month == 12:
-        last_month_end = datetime(last_year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_month_end = datetime(last_year, last_month + 1, 1) - timedelta(days=1)
-
-    last_month_start = timezone.datetime.combine(
-        last_month_start, timezone.datetime.min.time()
-    )
-    last_month_start = current_tz.localize(last_month_start)
-
-    last_month_end = timezone.datetime.combine(
-        last_month_end, timezone.datetime.max.time()
-    )
-    last_month_end = current_tz.localize(last_month_end)
-
-    last_month_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_month_start,
-            date__lte=last_month_end,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    last_month_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_month_start,
-            date__lte=last_month_end,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    last_month_expenses = report.last_month_expenses
+    last_month_income = report.last_month_income
 
     # Calculate percentage changes
     expense_change_pct = (
@@ -390,103 +292,52 @@ def monthly_report(request):
     expense_change_abs_pct = min(abs(expense_change_pct), 100)
     income_change_abs_pct = min(abs(income_change_pct), 100)
 
-    # Get expenses by category with percentage of total
-    expenses_by_category = get_expenses_by_category(
-        request.user, start_of_month, end_of_month
-    )
-
-    # Add percentage calculation to each category
-    for expense in expenses_by_category:
-        expense["percentage"] = (
-            (expense["total"] / monthly_expenses * 100) if monthly_expenses > 0 else 0
-        )
-
     # Get top 10 expenses
-    top_expenses = expenses_by_category[:10]
+    top_expenses = report.expenses_by_category[:10]
 
     # Get budget information
-    user_profile = request.user.userprofile
+    user_profile = user.userprofile
     monthly_budget = user_profile.monthly_budget
     budget_remaining = monthly_budget - monthly_expenses if monthly_budget else 0
     budget_used_percentage = (
         (monthly_expenses / monthly_budget * 100) if monthly_budget else 0
     )
-    days_left = (
-        (end_of_month.date() - today).days if end_of_month.date() >= today else 0
-    )
+    days_left = (report.end_date - today).days if report.end_date >= today else 0
     days_left = max(days_left, 1)  # Ensure at least 1 day
     daily_budget_left = (budget_remaining / days_left) if budget_remaining > 0 else 0
 
-    # Get daily expenses and income
-    daily_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        )
-        .annotate(day=Cast("date", output_field=DateField()))
-        .values("day")
-        .annotate(total=Sum("amount"))
-        .order_by("day")
-    )
-
-    daily_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        )
-        .annotate(day=Cast("date", output_field=DateField()))
-        .values("day")
-        .annotate(total=Sum("amount"))
-        .order_by("day")
-    )
-
     # Create daily trend data
-    daily_trend_data = []
-    date_range = [
-        (start_of_month + timedelta(days=i))
-        for i in range((end_of_month - start_of_month).days + 1)
+    daily_trend_data = [
+        {
+            "date": item["date"].strftime("%Y-%m-%d"),
+            "expenses": item["expenses"] or 0,
+            "income": item["income"] or 0,
+        }
+        for item in report.daily_totals
     ]
 
-    expense_dict = {item["day"]: item["total"] for item in daily_expenses}
-    income_dict = {item["day"]: item["total"] for item in daily_income}
-
-    for date in date_range:
-        daily_trend_data.append(
-            {
-                "date": date.strftime("%Y-%m-%d"),
-                "expenses": expense_dict.get(date.date(), 0),
-                "income": income_dict.get(date.date(), 0),
-            }
-        )
-
     # Get top spending days with their main category
+    daily_expenses = [
+        item for item in report.daily_totals if item["expenses"] is not None
+    ]
     top_spending_days = []
-    for day_data in sorted(daily_expenses, key=lambda x: x["total"], reverse=True)[:5]:
-        day = day_data["day"]
+    top_days = sorted(daily_expenses, key=lambda x: x["expenses"], reverse=True)[:5]
+
+    # Top category of every day of the month in a single query
+    top_categories_by_day = report.top_categories_by_day
+
+    for day_data in top_days:
+        day = day_data["date"]
 
         # Get top category for this day
-        day_top_category = (
-            Operation.objects.filter(
-                user=request.user,
-                date=day,
-                category__type="gasto",
-            )
-            .values("category__name", "category__color")
-            .annotate(total=Sum("amount"))
-            .order_by("-total")
-            .first()
-        )
+        day_top_category = (top_categories_by_day.get(day) or [None])[0]
 
         top_spending_days.append(
             {
                 "date": day,
-                "total": day_data["total"],
+                "total": day_data["expenses"],
                 "percentage": (
-                    (day_data["total"] / monthly_expenses * 100)
+                    (day_data["expenses"] / monthly_expenses * 100)
                     if monthly_expenses > 0
                     else 0
                 ),
@@ -500,84 +351,17 @@ def monthly_report(request):
         )
 
     # Get 6-month expense trend (including current month)
-    six_month_data = []
-    for i in range(5, -1, -1):
-        if month - i <= 0:
-            trend_month = month - i + 12
-            trend_year = year - 1
-        else:
-            trend_month = month - i
-            trend_year = year
-
-        trend_month_name = calendar.month_name[trend_month]
-
-        # First day of month
-        trend_start = datetime(trend_year, trend_month, 1)
-        # Last day of month
-        if trend_month == 12:
-            trend_end = datetime(trend_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            trend_end = datetime(trend_year, trend_month + 1, 1) - timedelta(days=1)
-
-        trend_start = timezone.datetime.combine(
-            trend_start, timezone.datetime.min.time()
-        )
-        trend_start = current_tz.localize(trend_start)
-
-        trend_end = timezone.datetime.combine(trend_end, timezone.datetime.max.time())
-        trend_end = current_tz.localize(trend_end)
-
-        trend_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=trend_start,
-                date__lte=trend_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        six_month_data.append(
-            {
-                "month": f"{trend_month_name[:3]} {trend_year}",
-                "expenses": trend_expenses,
-            }
-        )
+    six_month_data = [
+        {
+            "month": f"{item['month_name'][:3]} {item['year']}",
+            "expenses": item["expenses"],
+        }
+        for item in report.get_trend(6)
+    ]
 
     # Project next month expenses
     # Simple projection based on average of last 3 months
-    recent_months_expenses = []
-    for i in range(2, -1, -1):  # Last 3 months including current
-        if month - i <= 0:
-            proj_month = month - i + 12
-            proj_year = year - 1
-        else:
-            proj_month = month - i
-            proj_year = year
-
-        proj_start = datetime(proj_year, proj_month, 1)
-        if proj_month == 12:
-            proj_end = datetime(proj_year + 1, 1, 1) - timedelta(days=1)
-        else:
-            proj_end = datetime(proj_year, proj_month + 1, 1) - timedelta(days=1)
-
-        proj_start = timezone.datetime.combine(proj_start, timezone.datetime.min.time())
-        proj_start = current_tz.localize(proj_start)
-
-        proj_end = timezone.datetime.combine(proj_end, timezone.datetime.max.time())
-        proj_end = current_tz.localize(proj_end)
-
-        proj_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=proj_start,
-                date__lte=proj_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        recent_months_expenses.append(proj_expenses)
+    recent_months_expenses = [item["expenses"] for item in report.get_trend(3)]
 
     # Projected expenses with a slight trend weighting
     if len(recent_months_expenses) >= 3:
@@ -732,160 +516,29 @@ def monthly_report(request):
         "daily_trend_chart_data": json.dumps(daily_trend_chart_data),
         "six_month_trend_data": json.dumps(six_month_trend_data),
     }
-    return render(request, "monthly_report.html", context)
+    return context
 
 
 @login_required
 def export_monthly_report(request):
-    """Export monthly report data to Excel or PDF"""
+    """Export monthly report data to Excel, PDF, CSV or JSON"""
     export_format = request.GET.get("format", "excel")
     month = int(request.GET.get("month", timezone.now().month))
     year = int(request.GET.get("year", timezone.now().year))
 
-    # Get user's timezone
-    user_timezone = request.user.userprofile.timezone or "UTC"
-    current_tz = pytz.timezone(user_timezone)
-
-    # Create datetime objects for start and end of month
-    start_date = datetime(year, month, 1)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-
-    # Add timezone info
-    start_of_month = timezone.datetime.combine(start_date, timezone.datetime.min.time())
-    start_of_month = current_tz.localize(start_of_month)
-
-    end_of_month = timezone.datetime.combine(end_date, timezone.datetime.max.time())
-    end_of_month = current_tz.localize(end_of_month)
-
-    # Get month name
-    month_name = calendar.month_name[month]
-
-    # Prepare data for export
-    expenses_by_category = get_expenses_by_category(
-        request.user, start_of_month, end_of_month
-    )
-
-    # Monthly totals
-    monthly_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    monthly_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    monthly_balance = monthly_income - monthly_expenses
-
-    # Format data for export
-    report_data = []
-
-    # Summary row
-    report_data.append(
-        {
-            "Sección": "Resumen Mensual",
-            "Concepto": "Mes y año",
-            "Valor": f"{month_name} {year}",
-            "Adicional": "",
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Mensual",
-            "Concepto": "Ingresos",
-            "Valor": monthly_income,
-            "Adicional": request.user.userprofile.currency,
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Mensual",
-            "Concepto": "Gastos",
-            "Valor": monthly_expenses,
-            "Adicional": request.user.userprofile.currency,
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Mensual",
-            "Concepto": "Balance",
-            "Valor": monthly_balance,
-            "Adicional": request.user.userprofile.currency,
-        }
-    )
-
-    # Category breakdown
-    for category in expenses_by_category:
-        report_data.append(
-            {
-                "Sección": "Gastos por Categoría",
-                "Concepto": category["category__name"],
-                "Valor": category["total"],
-                "Adicional": (
-                    f"{(category['total'] / monthly_expenses * 100):.1f}% del total"
-                    if monthly_expenses > 0
-                    else "0.0%"
-                ),
-            }
+    if request.GET.get("background"):
+        return start_export_job(
+            request, "monthly", export_format, {"year": year, "month": month}
         )
 
-    # Daily expenses
-    daily_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_month,
-            date__lte=end_of_month,
-            category__type="gasto",
-        )
-        .annotate(day=Cast("date", output_field=DateField()))
-        .values("day")
-        .annotate(total=Sum("amount"))
-        .order_by("day")
+    return export_response(
+        request.user,
+        "monthly",
+        [year, month],
+        export_format,
+        lambda: get_monthly_export(request.user, year, month),
     )
 
-    for day_data in daily_expenses:
-        report_data.append(
-            {
-                "Sección": "Gastos Diarios",
-                "Concepto": day_data["day"].strftime("%d/%m/%Y"),
-                "Valor": day_data["total"],
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-
-    # Set filename
-    filename = f"Reporte_Mensual_{month_name}_{year}"
-
-    if export_format == "excel":
-        # Export to Excel
-        output = export_to_excel(report_data, f"Reporte {month_name} {year}")
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
-        return response
-    else:
-        # Export to PDF
-        output = export_to_pdf(report_data)
-        response = HttpResponse(output.read(), content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{filename}.pdf"'
-        return response
-
 
 @login_required
 def annual_report(request):
@@ -901,79 +554,31 @@ def annual_report(request):
     # Get requested year or default to current
     year = int(request.GET.get("year", today.year))
 
-    # Create datetime objects for start and end of year
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31)
-
-    # Add timezone info
-    start_of_year = timezone.datetime.combine(start_date, timezone.datetime.min.time())
-    start_of_year = current_tz.localize(start_of_year)
+    context = get_cached_report(
+        request.user,
+        "annual",
+        [year, today],
+        lambda: get_annual_report_context(request.user, today, year),
+    )
+    return render(request, "annual_report.html", context)
 
-    end_of_year = timezone.datetime.combine(end_date, timezone.datetime.max.time())
-    end_of_year = current_tz.localize(end_of_year)
 
+def get_annual_report_context(user, today, year):
+    """Compute the annual report of the given year"""
     # Generate years for the selector
     current_year = today.year
     years = list(range(current_year - 5, current_year + 2))
 
-    # Annual totals
-    annual_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_year,
-            date__lte=end_of_year,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    # Annual figures from a single month x type aggregation, or from the
+    # snapshot of a closed year
+    report = get_annual_report(user, today, year)
 
-    annual_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_year,
-            date__lte=end_of_year,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    # Calculate balance and savings rate
-    annual_balance = annual_income - annual_expenses
-    savings_rate = (annual_balance / annual_income * 100) if annual_income > 0 else 0
-
-    # Get last year data for comparison
-    last_year_start = datetime(year - 1, 1, 1)
-    last_year_end = datetime(year - 1, 12, 31)
-
-    last_year_start = timezone.datetime.combine(
-        last_year_start, timezone.datetime.min.time()
-    )
-    last_year_start = current_tz.localize(last_year_start)
-
-    last_year_end = timezone.datetime.combine(
-        last_year_end, timezone.datetime.max.time()
-    )
-    last_year_end = current_tz.localize(last_year_end)
-
-    last_year_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_year_start,
-            date__lte=last_year_end,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
-
-    last_year_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=last_year_start,
-            date__lte=last_year_end,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+    annual_expenses = report.annual_expenses
+    annual_income = report.annual_income
+    annual_balance = report.annual_balance
+    savings_rate = report.savings_rate
+    last_year_expenses = report.last_year_expenses
+    last_year_income = report.last_year_income
 
     # Calculate percentage changes
     expense_change_pct = (
@@ -991,116 +596,26 @@ def annual_report(request):
     expense_change_abs_pct = min(abs(expense_change_pct), 100)
     income_change_abs_pct = min(abs(income_change_pct), 100)
 
-    # Get expenses by category with percentage of total
-    expenses_by_category = get_expenses_by_category(
-        request.user, start_of_year, end_of_year
-    )
-
-    # Add percentage calculation to each category
-    for expense in expenses_by_category:
-        expense["percentage"] = (
-            (expense["total"] / annual_expenses * 100) if annual_expenses > 0 else 0
-        )
-
     # Get top 10 expenses
-    top_expenses = expenses_by_category[:10]
-
-    # Get monthly breakdown of expenses and income
-    monthly_expenses_data = []
-    monthly_income_data = []
-
-    for month in range(1, 13):
-        # Create datetime objects for start and end of month
-        month_start = datetime(year, month, 1)
-        if month == 12:
-            month_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = datetime(year, month + 1, 1) - timedelta(days=1)
-
-        # Add timezone info
-        month_start = timezone.datetime.combine(
-            month_start, timezone.datetime.min.time()
-        )
-        month_start = current_tz.localize(month_start)
-
-        month_end = timezone.datetime.combine(month_end, timezone.datetime.max.time())
-        month_end = current_tz.localize(month_end)
-
-        # Get month name (abbreviated)
-        month_name = calendar.month_abbr[month]
-
-        # Get expenses and income for the month
-        month_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=month_start,
-                date__lte=month_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        month_income = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=month_start,
-                date__lte=month_end,
-                category__type="ingreso",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        monthly_expenses_data.append(
-            {
-                "month": f"{month_name}",
-                "expenses": month_expenses,
-            }
-        )
-
-        monthly_income_data.append(
-            {
-                "month": f"{month_name}",
-                "income": month_income,
-            }
-        )
+    top_expenses = report.expenses_by_category[:10]
 
     # Get top spending months with their main category
     top_spending_months = []
-    for month_data in sorted(
-        monthly_expenses_data, key=lambda x: x["expenses"], reverse=True
-    )[:3]:
-        month_index = monthly_expenses_data.index(month_data) + 1
-        month_start = datetime(year, month_index, 1)
-        if month_index == 12:
-            month_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = datetime(year, month_index + 1, 1) - timedelta(days=1)
 
-        month_start = timezone.datetime.combine(
-            month_start, timezone.datetime.min.time()
-        )
-        month_start = current_tz.localize(month_start)
+    # Top category of every month of the year in a single query
+    top_categories_by_month = report.top_categories_by_month
 
-        month_end = timezone.datetime.combine(month_end, timezone.datetime.max.time())
-        month_end = current_tz.localize(month_end)
+    for month_data in sorted(
+        report.monthly_data, key=lambda x: x["expenses"], reverse=True
+    )[:3]:
+        month_start, month_end = report.get_month_bounds(month_data["month"])
 
         # Get top category for this month
-        month_top_category = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=month_start,
-                date__lte=month_end,
-                category__type="gasto",
-            )
-            .values("category__name", "category__color")
-            .annotate(total=Sum("amount"))
-            .order_by("-total")
-            .first()
-        )
+        month_top_category = (top_categories_by_month.get(month_start) or [None])[0]
 
         top_spending_months.append(
             {
-                "month": month_data["month"],
+                "month": month_data["month_abbr"],
                 "total": month_data["expenses"],
                 "percentage": (
                     (month_data["expenses"] / annual_expenses * 100)
@@ -1191,11 +706,11 @@ def annual_report(request):
 
     # Prepare monthly trend chart data
     monthly_trend_chart_data = {
-        "labels": [item["month"] for item in monthly_expenses_data],
+        "labels": [item["month_abbr"] for item in report.monthly_data],
         "datasets": [
             {
                 "label": "Gastos",
-                "data": [float(item["expenses"]) for item in monthly_expenses_data],
+                "data": [float(item["expenses"]) for item in report.monthly_data],
                 "borderColor": "#dc3545",
                 "backgroundColor": "rgba(220, 53, 69, 0.1)",
                 "fill": True,
@@ -1203,10 +718,7 @@ def annual_report(request):
             },
             {
                 "label": "Ingresos",
-                "data": [
-                    float(monthly_income_data[i]["income"])
-                    for i in range(len(monthly_income_data))
-                ],
+                "data": [float(item["income"]) for item in report.monthly_data],
                 "borderColor": "#28a745",
                 "backgroundColor": "rgba(40, 167, 69, 0.1)",
                 "fill": True,
@@ -1216,101 +728,10 @@ def annual_report(request):
     }
 
     # Year over year comparison (last 3 years if available)
-    yearly_comparison_data = []
-    for i in range(2, -1, -1):  # Last 3 years including current
-        comparison_year = year - i
-
-        comparison_start = datetime(comparison_year, 1, 1)
-        comparison_end = datetime(comparison_year, 12, 31)
-
-        comparison_start = timezone.datetime.combine(
-            comparison_start, timezone.datetime.min.time()
-        )
-        comparison_start = current_tz.localize(comparison_start)
-
-        comparison_end = timezone.datetime.combine(
-            comparison_end, timezone.datetime.max.time()
-        )
-        comparison_end = current_tz.localize(comparison_end)
-
-        comparison_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=comparison_start,
-                date__lte=comparison_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        comparison_income = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=comparison_start,
-                date__lte=comparison_end,
-                category__type="ingreso",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        yearly_comparison_data.append(
-            {
-                "year": str(comparison_year),
-                "expenses": comparison_expenses,
-                "income": comparison_income,
-            }
-        )
-
-    # Calculate quarterly data
-    quarterly_data = []
-    for quarter in range(1, 5):
-        start_month = (quarter - 1) * 3 + 1
-        end_month = quarter * 3
+    yearly_comparison_data = report.yearly_comparison_data
 
-        quarter_start = datetime(year, start_month, 1)
-        if end_month == 12:
-            quarter_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            quarter_end = datetime(year, end_month + 1, 1) - timedelta(days=1)
-
-        quarter_start = timezone.datetime.combine(
-            quarter_start, timezone.datetime.min.time()
-        )
-        quarter_start = current_tz.localize(quarter_start)
-
-        quarter_end = timezone.datetime.combine(
-            quarter_end, timezone.datetime.max.time()
-        )
-        quarter_end = current_tz.localize(quarter_end)
-
-        quarter_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=quarter_start,
-                date__lte=quarter_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        quarter_income = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=quarter_start,
-                date__lte=quarter_end,
-                category__type="ingreso",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        quarterly_data.append(
-            {
-                "quarter": f"Q{quarter}",
-                "expenses": quarter_expenses,
-                "income": quarter_income,
-                "balance": quarter_income - quarter_expenses,
-            }
-        )
+    # Quarterly data
+    quarterly_data = report.quarterly_data
 
     # Prepare yearly comparison chart data
     yearly_comparison_chart_data = {
@@ -1365,273 +786,85 @@ def annual_report(request):
         "yearly_comparison_chart_data": json.dumps(yearly_comparison_chart_data),
         "quarterly_chart_data": json.dumps(quarterly_chart_data),
         "quarterly_data": quarterly_data,
-        "currency": request.user.userprofile.currency,
+        "currency": user.userprofile.currency,
     }
-    return render(request, "annual_report.html", context)
+    return context
 
 
 @login_required
 def export_annual_report(request):
-    """Export annual report data to Excel or PDF"""
+    """Export annual report data to Excel, PDF, CSV or JSON"""
     export_format = request.GET.get("format", "excel")
     year = int(request.GET.get("year", timezone.now().year))
 
-    # Get user's timezone
-    user_timezone = request.user.userprofile.timezone or "UTC"
-    current_tz = pytz.timezone(user_timezone)
-
-    # Create datetime objects for start and end of year
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31)
-
-    # Add timezone info
-    start_of_year = timezone.datetime.combine(start_date, timezone.datetime.min.time())
-    start_of_year = current_tz.localize(start_of_year)
+    if request.GET.get("background"):
+        return start_export_job(request, "annual", export_format, {"year": year})
 
-    end_of_year = timezone.datetime.combine(end_date, timezone.datetime.max.time())
-    end_of_year = current_tz.localize(end_of_year)
-
-    # Prepare data for export
-    expenses_by_category = get_expenses_by_category(
-        request.user, start_of_year, end_of_year
+    return export_response(
+        request.user,
+        "annual",
+        [year],
+        export_format,
+        lambda: get_annual_export(request.user, year),
     )
 
-    # Annual totals
-    annual_expenses = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_year,
-            date__lte=end_of_year,
-            category__type="gasto",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
 
-    annual_income = (
-        Operation.objects.filter(
-            user=request.user,
-            date__gte=start_of_year,
-            date__lte=end_of_year,
-            category__type="ingreso",
-        ).aggregate(Sum("amount"))["amount__sum"]
-        or 0
-    )
+def export_response(user, name, period, export_format, build):
+    """Send an export as an attachment, from the disk cache when unchanged"""
+    exporter = get_exporter(export_format)
 
-    annual_balance = annual_income - annual_expenses
-    savings_rate = (annual_balance / annual_income * 100) if annual_income > 0 else 0
+    def render():
+        report_data, title, filename = build()
+        output = exporter.render(report_data, title)
+        return output, f"{filename}.{exporter.extension}"
 
-    # Format data for export
-    report_data = []
-
-    # Summary row
-    report_data.append(
-        {
-            "Sección": "Resumen Anual",
-            "Concepto": "Año",
-            "Valor": f"{year}",
-            "Adicional": "",
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Anual",
-            "Concepto": "Ingresos totales",
-            "Valor": annual_income,
-            "Adicional": request.user.userprofile.currency,
-        }
+    output, filename = get_cached_export(user, name, period, exporter.name, render)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type=exporter.content_type,
     )
-    report_data.append(
-        {
-            "Sección": "Resumen Anual",
-            "Concepto": "Gastos totales",
-            "Valor": annual_expenses,
-            "Adicional": request.user.userprofile.currency,
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Anual",
-            "Concepto": "Balance anual",
-            "Valor": annual_balance,
-            "Adicional": request.user.userprofile.currency,
-        }
-    )
-    report_data.append(
-        {
-            "Sección": "Resumen Anual",
-            "Concepto": "Tasa de ahorro",
-            "Valor": f"{savings_rate:.1f}%",
-            "Adicional": "",
-        }
-    )
-
-    # Category breakdown
-    for category in expenses_by_category:
-        report_data.append(
-            {
-                "Sección": "Gastos por Categoría",
-                "Concepto": category["category__name"],
-                "Valor": category["total"],
-                "Adicional": (
-                    f"{(category['total'] / annual_expenses * 100):.1f}% del total"
-                    if annual_expenses > 0
-                    else "0.0%"
-                ),
-            }
-        )
-
-    # Monthly breakdown
-    for month in range(1, 13):
-        # Create datetime objects for start and end of month
-        month_start = datetime(year, month, 1)
-        if month == 12:
-            month_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = datetime(year, month + 1, 1) - timedelta(days=1)
-
-        # Add timezone info
-        month_start = timezone.datetime.combine(
-            month_start, timezone.datetime.min.time()
-        )
-        month_start = current_tz.localize(month_start)
-
-        month_end = timezone.datetime.combine(month_end, timezone.datetime.max.time())
-        month_end = current_tz.localize(month_end)
-
-        # Get month name
-        month_name = calendar.month_name[month]
-
-        # Get expenses and income for the month
-        month_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=month_start,
-                date__lte=month_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        month_income = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=month_start,
-                date__lte=month_end,
-                category__type="ingreso",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
-
-        month_balance = month_income - month_expenses
-
-        report_data.append(
-            {
-                "Sección": "Desglose Mensual",
-                "Concepto": month_name,
-                "Valor": f"Ingresos: {month_income}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-        report_data.append(
-            {
-                "Sección": "Desglose Mensual",
-                "Concepto": month_name,
-                "Valor": f"Gastos: {month_expenses}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-        report_data.append(
-            {
-                "Sección": "Desglose Mensual",
-                "Concepto": month_name,
-                "Valor": f"Balance: {month_balance}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-
-    # Quarterly breakdown
-    for quarter in range(1, 5):
-        start_month = (quarter - 1) * 3 + 1
-        end_month = quarter * 3
 
-        quarter_start = datetime(year, start_month, 1)
-        if end_month == 12:
-            quarter_end = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            quarter_end = datetime(year, end_month + 1, 1) - timedelta(days=1)
 
-        quarter_start = timezone.datetime.combine(
-            quarter_start, timezone.datetime.min.time()
-        )
-        quarter_start = current_tz.localize(quarter_start)
+def start_export_job(request, report_type, export_format, params):
+    """Queue an export to be rendered in the background
 
-        quarter_end = timezone.datetime.combine(
-            quarter_end, timezone.datetime.max.time()
-        )
-        quarter_end = current_tz.localize(quarter_end)
-
-        quarter_expenses = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=quarter_start,
-                date__lte=quarter_end,
-                category__type="gasto",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
+    Exports already in the disk cache are sent right away instead.
+    """
+    exporter = get_exporter(export_format)
+    cached = find_cached_export(
+        request.user, report_type, EXPORT_PERIODS[report_type](params), exporter.name
+    )
+    if cached is not None:
+        output, filename = cached
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type=exporter.content_type,
         )
 
-        quarter_income = (
-            Operation.objects.filter(
-                user=request.user,
-                date__gte=quarter_start,
-                date__lte=quarter_end,
-                category__type="ingreso",
-            ).aggregate(Sum("amount"))["amount__sum"]
-            or 0
-        )
+    job = enqueue_export(request.user, report_type, exporter.name, params)
+    return redirect("reports:export_job", pk=job.pk)
 
-        quarter_balance = quarter_income - quarter_expenses
 
-        report_data.append(
-            {
-                "Sección": "Desglose Trimestral",
-                "Concepto": f"Trimestre {quarter}",
-                "Valor": f"Ingresos: {quarter_income}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-        report_data.append(
-            {
-                "Sección": "Desglose Trimestral",
-                "Concepto": f"Trimestre {quarter}",
-                "Valor": f"Gastos: {quarter_expenses}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
-        report_data.append(
-            {
-                "Sección": "Desglose Trimestral",
-                "Concepto": f"Trimestre {quarter}",
-                "Valor": f"Balance: {quarter_balance}",
-                "Adicional": request.user.userprofile.currency,
-            }
-        )
+@login_required
+def export_job(request, pk):
+    """Status of a background export, with its download link once it is ready"""
+    job = get_object_or_404(ExportJob, pk=pk, user=request.user)
+    return render(request, "export_job.html", {"job": job})
 
-    # Set filename
-    filename = f"Reporte_Anual_{year}"
 
-    if export_format == "excel":
-        # Export to Excel
-        output = export_to_excel(report_data, f"Reporte Anual {year}")
-        response = HttpResponse(
-            output.read(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        response["Content-Disposition"] = f'attachment; filename="{filename}.xlsx"'
-        return response
-    else:
-        # Export to PDF
-        output = export_to_pdf(report_data)
-        response = HttpResponse(output.read(), content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{filename}.pdf"'
-        return response
+@login_required
+def download_export_job(request, pk):
+    """Download the file of a finished background export"""
+    job = get_object_or_404(
+        ExportJob, pk=pk, user=request.user, status=ExportJob.STATUS_DONE
+    )
+    return FileResponse(
+        job.file.open("rb"),
+        as_attachment=True,
+        filename=os.path.basename(job.file.name),
+        content_type=get_exporter(job.format).content_type,
+    )